@@ -3,11 +3,115 @@
 Python has no channel-based timers. We use:
 - time.sleep for fixed interval rate limiting
 - queue.Queue as a token bucket
+- AsyncLimiter: an asyncio token bucket that delays callers without a thread
 """
 
+import asyncio
 import queue
 import threading
 import time
+from collections import deque
+
+
+class AsyncLimiter:
+    """Token bucket (rate tokens/sec, burst capacity) for asyncio code.
+
+    acquire(cost) waits until cost tokens are available instead of
+    rejecting. Waiters are served strictly FIFO, and the limiter keeps a
+    single timer armed for the head of the queue rather than one sleep per
+    waiter. A cancelled waiter is skipped (and refunded if its tokens were
+    already granted), so cancellation never stalls the queue.
+    """
+
+    def __init__(self, rate: float, burst: float) -> None:
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.last = time.monotonic()  # asyncio's loop.time() uses the same clock
+        self.waiters: deque = deque()  # (cost, future), oldest first
+        self.timer: asyncio.TimerHandle | None = None
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.last) * self.rate)
+        self.last = now
+
+    def try_acquire(self, cost: float = 1) -> bool:
+        """Take cost tokens now if possible; never waits or jumps the queue."""
+        self._refill()
+        self._drop_cancelled()
+        if self.waiters or self.tokens < cost:
+            return False
+        self.tokens -= cost
+        return True
+
+    async def acquire(self, cost: float = 1) -> float:
+        """Wait for cost tokens. Returns the seconds spent waiting."""
+        if cost > self.burst:
+            raise ValueError(f"cost {cost} exceeds burst {self.burst}")
+        if self.try_acquire(cost):
+            return 0.0
+        start = time.monotonic()
+        fut = asyncio.get_running_loop().create_future()
+        self.waiters.append((cost, fut))
+        self._arm()
+        try:
+            await fut
+        except asyncio.CancelledError:
+            if fut.done() and not fut.cancelled():
+                self.tokens += cost  # granted just as we were cancelled: refund
+            self._wake()  # the head may have changed
+            raise
+        return time.monotonic() - start
+
+    def _drop_cancelled(self) -> None:
+        while self.waiters and self.waiters[0][1].done():
+            self.waiters.popleft()
+
+    def _wake(self) -> None:
+        """Grant tokens to waiters at the head of the queue, then re-arm.
+
+        Runs from the timer or from a cancelling waiter; either way _arm()
+        replaces whatever timer is armed, so there is never more than one.
+        """
+        self._refill()
+        while True:
+            self._drop_cancelled()
+            if not self.waiters:
+                break
+            cost, fut = self.waiters[0]
+            if self.tokens < cost:
+                break
+            self.tokens -= cost
+            self.waiters.popleft()
+            fut.set_result(None)
+        self._arm()
+
+    def _arm(self) -> None:
+        """Keep exactly one timer, due when the head waiter can be paid."""
+        if self.timer is not None:
+            self.timer.cancel()
+            self.timer = None
+        if self.waiters:
+            cost = self.waiters[0][0]
+            delay = max(0.0, (cost - self.tokens) / self.rate)
+            self.timer = asyncio.get_running_loop().call_later(delay, self._wake)
+
+
+async def async_demo() -> None:
+    limiter = AsyncLimiter(rate=5, burst=3)  # 5 req/sec, burst of 3
+    start = time.perf_counter()
+
+    async def call(i: int) -> None:
+        waited = await limiter.acquire()
+        elapsed = time.perf_counter() - start
+        print(f"  call {i} at {elapsed*1000:.0f}ms (waited {waited*1000:.0f}ms)")
+
+    tasks = [asyncio.create_task(call(i)) for i in range(1, 7)]
+    await asyncio.sleep(0.05)
+    tasks[4].cancel()  # call 5 gives up; call 6 moves up instead of stalling
+    await asyncio.gather(*tasks, return_exceptions=True)
+    print(f"  try_acquire right after: {limiter.try_acquire()}")
 
 
 def main() -> None:
@@ -49,6 +153,10 @@ def main() -> None:
         elapsed = time.perf_counter() - start2
         print(f"  request {i} at {elapsed*1000:.0f}ms")
 
+    # --- Example 3: asyncio limiter (delay, don't drop; no threads) ---
+    print("\n=== AsyncLimiter (FIFO waiters, one timer) ===")
+    asyncio.run(async_demo())
+
 
 if __name__ == "__main__":
     main()
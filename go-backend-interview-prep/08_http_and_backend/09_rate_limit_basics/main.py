@@ -1,48 +1,115 @@
 """Rate limit basics -- Python equivalent of the Go example.
 
 Token bucket rate limiter with threading.Lock for concurrency safety.
+Tokens refill lazily and continuously on each call -- no background thread.
 """
 
 import json
+import math
 import threading
 import time
 import urllib.request
 import urllib.error
+from collections import OrderedDict
 from http.server import HTTPServer, BaseHTTPRequestHandler
 
 
 class TokenBucket:
+    """max_tokens per refill_interval, refilled continuously.
+
+    Instead of a thread that resets the bucket to full every interval
+    (which allows 2x max_tokens around each reset), tokens accrue at
+    max_tokens / refill_interval per second and are topped up from the
+    elapsed time whenever the bucket is used.
+    """
+
     def __init__(self, max_tokens: int, refill_interval: float):
         self.max_tokens = max_tokens
-        self.tokens = max_tokens
         self.refill_interval = refill_interval
+        self.rate = max_tokens / refill_interval  # tokens per second
+        self.tokens = float(max_tokens)
+        self.last = time.monotonic()
         self.lock = threading.Lock()
-        # Refill tokens periodically
-        self._start_refill()
-
-    def _start_refill(self):
-        def refill():
-            while True:
-                time.sleep(self.refill_interval)
-                with self.lock:
-                    self.tokens = self.max_tokens
-        t = threading.Thread(target=refill, daemon=True)
-        t.start()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.tokens = min(self.max_tokens, self.tokens + (now - self.last) * self.rate)
+        self.last = now
 
     def allow(self) -> bool:
         with self.lock:
-            if self.tokens > 0:
+            self._refill()
+            if self.tokens >= 1:
                 self.tokens -= 1
                 return True
             return False
 
     def remaining(self) -> int:
         with self.lock:
-            return self.tokens
+            self._refill()
+            return int(self.tokens)
+
+    def retry_after(self) -> float:
+        """Seconds until the next token is available."""
+        with self.lock:
+            self._refill()
+            return max(0.0, (1 - self.tokens) / self.rate)
+
+
+IDLE_SCAN = 2  # least recently used buckets checked for idleness per get()
+
+
+class LimiterRegistry:
+    """Named TokenBuckets created on first use, all sharing one config.
+
+    Buckets hold no threads or timers, so thousands of limiters (one per
+    user, route or API key) cost only their few attributes each.
+
+    A bucket untouched for refill_interval is full again, exactly like a
+    new one, so dropping it changes no decision. Buckets are kept in LRU
+    order and each get() drops up to IDLE_SCAN idle ones from the cold
+    end, so the registry tracks recently active names, not every name seen.
+    """
+
+    def __init__(self, max_tokens: int, refill_interval: float):
+        self.max_tokens = max_tokens
+        self.refill_interval = refill_interval
+        self.lock = threading.Lock()
+        self.buckets: OrderedDict[str, TokenBucket] = OrderedDict()
+
+    def get(self, name: str) -> TokenBucket:
+        with self.lock:
+            bucket = self.buckets.get(name)
+            if bucket is None:
+                bucket = self.buckets[name] = TokenBucket(self.max_tokens, self.refill_interval)
+            else:
+                self.buckets.move_to_end(name)
+                with bucket.lock:
+                    bucket._refill()  # marks it active, so no reclaim drops it in use
+            self._reclaim()
+        return bucket
+
+    def _reclaim(self) -> None:
+        """Drop idle buckets from the LRU end. Caller holds self.lock."""
+        idle_before = time.monotonic() - self.refill_interval
+        for _ in range(min(IDLE_SCAN, len(self.buckets))):
+            name, bucket = next(iter(self.buckets.items()))
+            if bucket.last > idle_before:
+                return  # LRU order: everything after it is newer
+            del self.buckets[name]
+
+    def __len__(self) -> int:
+        return len(self.buckets)
+
+    def allow(self, name: str) -> bool:
+        return self.get(name).allow()
+
+    def remaining(self, name: str) -> int:
+        return self.get(name).remaining()
 
 
-# Global limiter: 5 requests per 3 seconds
-limiter = TokenBucket(max_tokens=5, refill_interval=3.0)
+# Per-client limiters: 5 requests per 3 seconds each
+limiters = LimiterRegistry(max_tokens=5, refill_interval=3.0)
 
 
 def json_response(handler, status: int, data: dict, extra_headers=None) -> None:
@@ -58,12 +125,14 @@ def json_response(handler, status: int, data: dict, extra_headers=None) -> None:
 class Handler(BaseHTTPRequestHandler):
     def do_GET(self):
         if self.path == "/api":
+            limiter = limiters.get(self.client_address[0])
             if not limiter.allow():
+                wait = limiter.retry_after()
                 json_response(self, 429, {
                     "error": "rate limit exceeded",
-                    "retry_after": f"{limiter.refill_interval:.0f}s",
+                    "retry_after": f"{wait:.1f}s",
                 }, extra_headers={
-                    "Retry-After": str(int(limiter.refill_interval)),
+                    "Retry-After": str(math.ceil(wait)),
                 })
                 return
 
@@ -95,13 +164,27 @@ def main() -> None:
             print(f"  request {i}: status={resp.status} remaining={remaining} msg={data.get('message', '')}")
         except urllib.error.HTTPError as e:
             data = json.loads(e.read())
-            print(f"  request {i}: status={e.code} msg={data.get('error', '')}")
+            print(f"  request {i}: status={e.code} msg={data.get('error', '')} retry_after={data.get('retry_after')}")
 
-    print(f"\n  waiting 3s for token refill...")
-    time.sleep(3)
+    print(f"\n  waiting 1s: tokens refill continuously (~1.7/s)...")
+    time.sleep(1)
 
     resp = urllib.request.urlopen(f"{base}/api", timeout=5)
-    print(f"  after refill: status={resp.status}")
+    print(f"  after 1s: status={resp.status} remaining={resp.headers.get('X-RateLimit-Remaining')}")
+
+    print("\n--- Registry: 10,000 named limiters ---")
+    for n in range(10_000):
+        limiters.allow(f"user:{n}")
+    print(f"  limiters={len(limiters)} threads={threading.active_count()}")
+
+    # Idle buckets are full again, so they are dropped as new names arrive
+    registry = LimiterRegistry(max_tokens=5, refill_interval=0.2)
+    for n in range(10_000):
+        registry.allow(f"old:{n}")
+    time.sleep(0.25)
+    for n in range(10_000):
+        registry.allow(f"new:{n}")
+    print(f"  20,000 names, first 10,000 idle: limiters={len(registry)}")
 
     server.shutdown()
     print("\nDone.")
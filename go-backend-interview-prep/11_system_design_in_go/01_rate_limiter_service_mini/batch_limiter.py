@@ -0,0 +1,173 @@
+"""Batch admission for token-bucket rate limits.
+
+Gateway workers pull requests off an accept queue in batches; admitting
+them one allow() call at a time pays a lock round trip and the refill
+arithmetic per request. allow_many(keys, costs) takes the lock once,
+refills every bucket touched by the batch, and debits them together.
+
+Token state lives in two parallel arrays (tokens, last refill time)
+indexed through a key -> slot dict. With NumPy installed the refill and
+debit are vectorized; otherwise array('d') columns and a plain loop give
+the same answers.
+
+Within one batch a key's requests are admitted in order until one does
+not fit; the rest of that key's requests in the batch are denied
+(per-key prefix admission), so a large request is never overtaken by
+later small ones from the same key.
+
+Run: python3 ./11_system_design_in_go/01_rate_limiter_service_mini/batch_limiter.py
+"""
+
+import threading
+import time
+from array import array
+
+try:
+    import numpy as np
+except ImportError:  # pure-Python fallback below
+    np = None
+
+INITIAL_SLOTS = 1024
+
+
+class BatchLimiter:
+    """Token buckets (refill_rate tokens/sec, burst max_tokens) stored as
+    columns. use_numpy=None picks NumPy when it is importable."""
+
+    def __init__(self, refill_rate, max_tokens, use_numpy=None):
+        if use_numpy is None:
+            use_numpy = np is not None
+        elif use_numpy and np is None:
+            raise ImportError("use_numpy=True but numpy is not installed")
+        self.refill_rate = refill_rate
+        self.max_tokens = max_tokens
+        self.use_numpy = use_numpy
+        self.lock = threading.Lock()
+        self.slots = {}  # key -> index into the columns
+        if use_numpy:
+            self.tokens = np.empty(INITIAL_SLOTS, dtype=np.float64)
+            self.last = np.empty(INITIAL_SLOTS, dtype=np.float64)
+        else:
+            self.tokens = array("d")
+            self.last = array("d")
+
+    def allow(self, key, cost=1):
+        return self.allow_many([key], [cost])[0]
+
+    def allow_many(self, keys, costs=None):
+        """Admit a batch. costs defaults to 1 per key. Returns a list of bools
+        in the same order as keys."""
+        if not keys:
+            return []
+        with self.lock:
+            now = time.monotonic()
+            if self.use_numpy:
+                return self._admit_numpy(keys, costs, now)
+            return self._admit_python(keys, costs, now)
+
+    def size(self):
+        return len(self.slots)
+
+    # --- NumPy path (caller holds the lock) ---
+
+    def _slot_indexes(self, keys, now):
+        slots = self.slots
+        get = slots.get
+        idx = np.empty(len(keys), dtype=np.intp)
+        first_new = len(slots)
+        for i, key in enumerate(keys):
+            s = get(key)
+            if s is None:
+                s = slots[key] = len(slots)
+            idx[i] = s
+        if len(slots) > first_new:
+            self._grow(len(slots))
+            # New buckets start full; the refill below is then a no-op for them
+            self.tokens[first_new:len(slots)] = self.max_tokens
+            self.last[first_new:len(slots)] = now
+        return idx
+
+    def _grow(self, needed):
+        cap = len(self.tokens)
+        if needed <= cap:
+            return
+        while cap < needed:
+            cap *= 2
+        for name in ("tokens", "last"):
+            old = getattr(self, name)
+            col = np.empty(cap, dtype=np.float64)
+            col[:len(old)] = old
+            setattr(self, name, col)
+
+    def _admit_numpy(self, keys, costs, now):
+        idx = self._slot_indexes(keys, now)
+        cost = (np.ones(len(keys)) if costs is None
+                else np.asarray(costs, dtype=np.float64))
+        tokens, last = self.tokens, self.last
+
+        # Refill every touched bucket once
+        touched = np.unique(idx)
+        tokens[touched] = np.minimum(
+            self.max_tokens, tokens[touched] + (now - last[touched]) * self.refill_rate)
+        last[touched] = now
+
+        # Group each key's requests (stable: batch order kept inside a key),
+        # then admit while the running cost within the group fits
+        order = np.argsort(idx, kind="stable")
+        s, c = idx[order], cost[order]
+        running = np.cumsum(c)
+        starts = np.flatnonzero(np.r_[True, s[1:] != s[:-1]])
+        before = np.r_[0.0, running[:-1]][starts]  # total cost ahead of each group
+        within = running - np.repeat(before, np.diff(np.r_[starts, len(s)]))
+        ok = within <= tokens[s] + 1e-9  # costs > 0, so admitted is a prefix
+
+        np.subtract.at(tokens, s[ok], c[ok])
+        admitted = np.empty(len(keys), dtype=bool)
+        admitted[order] = ok
+        return admitted.tolist()
+
+    # --- pure-Python path (caller holds the lock) ---
+
+    def _admit_python(self, keys, costs, now):
+        slots, tokens, last = self.slots, self.tokens, self.last
+        rate, cap = self.refill_rate, self.max_tokens
+        blocked = set()  # slots that already denied a request in this batch
+        out = []
+        for i, key in enumerate(keys):
+            s = slots.get(key)
+            if s is None:
+                s = slots[key] = len(tokens)
+                tokens.append(cap)
+                last.append(now)
+            elif last[s] != now:
+                tokens[s] = min(cap, tokens[s] + (now - last[s]) * rate)
+                last[s] = now
+            c = 1 if costs is None else costs[i]
+            if s not in blocked and c <= tokens[s] + 1e-9:
+                tokens[s] -= c
+                out.append(True)
+            else:
+                blocked.add(s)
+                out.append(False)
+        return out
+
+
+# --- Demo ---
+
+def main():
+    backends = [False, True] if np is not None else [False]
+    for use_numpy in backends:
+        rl = BatchLimiter(refill_rate=2, max_tokens=5, use_numpy=use_numpy)
+        print(f"=== batch admission ({'numpy' if use_numpy else 'pure Python'}) ===")
+        keys = ["alice"] * 7 + ["bob"] * 3
+        print(f"batch 1: {list(zip(keys, rl.allow_many(keys)))}")
+        # bob has 2 tokens left: the 3-token request is denied and,
+        # being a prefix, so is the 1-token request queued behind it
+        print(f"batch 2: {rl.allow_many(['bob', 'bob', 'carol'], [3, 1, 5])}")
+        print(f"keys tracked: {rl.size()}\n")
+    if np is None:
+        print("(numpy not installed: only the pure-Python backend ran)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,213 @@
+"""Rate limiter benchmarks -- Python equivalent of a Go bench_test.go.
+
+- Memory: live buckets and RSS growth after N distinct keys, with and
+  without idle-bucket reclamation (default N = 10M, --keys to change)
+- Throughput: allow() calls per second as threads increase, one lock
+  (shards=1) vs lock striping (shards=16)
+- Engines: token bucket vs GCRA per-call cost (hot key, new keys with idle
+  reclamation, new keys that all stay live) and bytes per key (tracemalloc)
+- Batch: per-decision cost of allow_many at batch sizes 1..10k vs allow() loops
+- Shared memory: SharedLimiter decisions/sec across 1..8 processes, one hot
+  key (one stripe lock) vs spread keys
+Run: python ./11_system_design_in_go/01_rate_limiter_service_mini/bench_test.py --keys 1000000
+"""
+
+import argparse
+import gc
+import multiprocessing as mp
+import random
+import resource
+import threading
+import time
+import timeit
+import tracemalloc
+
+import batch_limiter
+from batch_limiter import BatchLimiter
+from main import GCRALimiter, RateLimiter
+from shm_limiter import SharedLimiter
+
+# 10 tokens at 1000/sec: a bucket is idle (full again) after 10ms
+REFILL_RATE = 1000
+MAX_TOKENS = 10
+
+
+def rss_bytes() -> int:
+    """Current resident set size; falls back to peak RSS off Linux."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * resource.getpagesize()
+    except OSError:
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def bench_memory(keys: int) -> None:
+    print(f"=== memory: {keys:,} distinct keys, one allow() each ===\n")
+    print(f"  {'mode':<12} {'live buckets':>13} {'RSS growth':>12} {'B/key seen':>11} {'allow/sec':>11}")
+    # Reclaiming run first: RSS freed by the second run is not always returned to the OS
+    for reclaim in (True, False):
+        gc.collect()
+        before = rss_bytes()
+        rl = RateLimiter(REFILL_RATE, MAX_TOKENS, reclaim_idle=reclaim)
+        allow = rl.allow
+        start = time.perf_counter()
+        for k in range(keys):
+            allow(k)
+        elapsed = time.perf_counter() - start
+        grown = rss_bytes() - before
+        mode = "reclaim" if reclaim else "keep all"
+        print(f"  {mode:<12} {rl.size():>13,} {grown / 2**20:>9.1f} MB "
+              f"{grown / keys:>11.1f} {keys / elapsed:>11,.0f}")
+        del rl, allow
+    print()
+
+
+def throughput(rl, threads: int, ops_per_thread: int, keyspace: int) -> float:
+    start_gate = threading.Barrier(threads + 1)
+
+    def worker(offset: int) -> None:
+        allow = rl.allow
+        start_gate.wait()
+        for i in range(ops_per_thread):
+            allow((offset + i) % keyspace)
+
+    workers = [threading.Thread(target=worker, args=(t * 7919,)) for t in range(threads)]
+    for w in workers:
+        w.start()
+    start_gate.wait()
+    start = time.perf_counter()
+    for w in workers:
+        w.join()
+    return threads * ops_per_thread / (time.perf_counter() - start)
+
+
+def bench_threads(ops_per_thread: int) -> None:
+    print(f"=== throughput: allow() calls/sec, {ops_per_thread:,} per thread, 100k keys ===\n")
+    print(f"  {'threads':>7}  {'1 lock':>12}  {'16 shards':>12}")
+    for threads in (1, 2, 4, 8):
+        one = throughput(RateLimiter(REFILL_RATE, MAX_TOKENS, shards=1), threads, ops_per_thread, 100_000)
+        striped = throughput(RateLimiter(REFILL_RATE, MAX_TOKENS, shards=16), threads, ops_per_thread, 100_000)
+        print(f"  {threads:>7}  {one:>12,.0f}  {striped:>12,.0f}")
+    print("\nNote: under the GIL striping mostly removes lock convoys; it cannot")
+    print("add parallelism. On free-threaded builds shards scale with cores.")
+
+
+def new_key_cost(rl, keys: int) -> float:
+    """ns per allow() for keys never seen before."""
+    allow = rl.allow
+    start = time.perf_counter()
+    for k in range(keys):
+        allow(k)
+    return (time.perf_counter() - start) / keys * 1e9
+
+
+def bench_engines(keys: int) -> None:
+    print(f"\n=== engines: token bucket vs GCRA ({keys:,} new keys) ===\n")
+    print(f"  {'engine':<13} {'hot key':>10} {'new keys':>10} {'all live':>10} {'bytes/key':>10}")
+    for name, cls in (("token bucket", RateLimiter), ("GCRA", GCRALimiter)):
+        # Hot key: the per-call cost of the refill arithmetic alone (best of 5)
+        rl = cls(REFILL_RATE, MAX_TOKENS)
+        runs = 200_000
+        hot = min(timeit.repeat(lambda: rl.allow("k"), number=runs, repeat=5)) / runs * 1e9
+
+        # As the service ships it: reclamation on, keys go idle after 10ms
+        fresh = new_key_cost(cls(REFILL_RATE, MAX_TOKENS), keys)
+        # Reclamation on but nothing idle yet: every key stays live
+        live = new_key_cost(cls(1e-6, MAX_TOKENS), keys)
+
+        gc.collect()
+        tracemalloc.start()
+        base = tracemalloc.get_traced_memory()[0]
+        rl = cls(REFILL_RATE, MAX_TOKENS, reclaim_idle=False)
+        for k in range(keys):
+            rl.allow(k)
+        per_key = (tracemalloc.get_traced_memory()[0] - base) / keys
+        tracemalloc.stop()
+        del rl
+        print(f"  {name:<13} {hot:>7.0f} ns {fresh:>7.0f} ns {live:>7.0f} ns {per_key:>10.1f}")
+    print("\n  bytes/key is measured with reclamation off, so every key is retained.")
+
+
+def bench_batch(decisions: int) -> None:
+    print(f"\n=== batch admission: ns per decision ({decisions:,} decisions, 10k keys) ===\n")
+    rng = random.Random(1)
+    keys = [f"client:{rng.randrange(10_000)}" for _ in range(decisions)]
+    backends = [("python", False)] + ([("numpy", True)] if batch_limiter.np is not None else [])
+    print(f"  {'batch':>6}  {'allow() loop':>12}" + "".join(f"  {name:>10}" for name, _ in backends))
+    for size in (1, 10, 100, 1000, 10_000):
+        batches = [keys[i:i + size] for i in range(0, decisions, size)]
+        rl = RateLimiter(REFILL_RATE, MAX_TOKENS)
+        start = time.perf_counter()
+        for batch in batches:
+            for k in batch:
+                rl.allow(k)
+        row = f"  {size:>6}  {(time.perf_counter() - start) / decisions * 1e9:>9.0f} ns"
+        for _, use_numpy in backends:
+            bl = BatchLimiter(REFILL_RATE, MAX_TOKENS, use_numpy=use_numpy)
+            start = time.perf_counter()
+            for batch in batches:
+                bl.allow_many(batch)
+            row += f"  {(time.perf_counter() - start) / decisions * 1e9:>7.0f} ns"
+        print(row)
+    if batch_limiter.np is None:
+        print("\n(numpy not installed: only the pure-Python batch backend ran)")
+
+
+def shared_worker(limiter, wid: int, ops: int, hot: bool, gate, results) -> None:
+    keys = ["hot"] if hot else [f"client:{wid}:{i}" for i in range(1000)]
+    n = len(keys)
+    allow = limiter.allow
+    gate.wait()
+    start = time.perf_counter()
+    allowed = 0
+    for i in range(ops):
+        allowed += allow(keys[i % n])
+    results.put((time.perf_counter() - start, allowed))
+    limiter.close()
+
+
+def bench_shared(procs: int, ops: int) -> None:
+    print(f"\n=== shared-memory limiter: decisions/sec, {ops:,} per process ===\n")
+    print(f"  {'procs':>5}  {'hot key':>12}  {'spread keys':>12}  {'hot allowed':>11}")
+    for n in [p for p in (1, 2, 4) if p < procs] + [procs]:
+        row = f"  {n:>5}"
+        hot_allowed = 0
+        for hot in (True, False):
+            # Burst 1000, ~no refill: hot-key admissions across all processes must total 1000
+            limiter = SharedLimiter(refill_rate=1e-6, max_tokens=1000)
+            gate, results = mp.Barrier(n), mp.Queue()
+            workers = [mp.Process(target=shared_worker, args=(limiter, w, ops, hot, gate, results))
+                       for w in range(n)]
+            for w in workers:
+                w.start()
+            done = [results.get() for _ in workers]
+            for w in workers:
+                w.join()
+            limiter.close()
+            slowest = max(elapsed for elapsed, _ in done)
+            row += f"  {n * ops / slowest:>12,.0f}"
+            if hot:
+                hot_allowed = sum(allowed for _, allowed in done)
+        print(f"{row}  {hot_allowed:>11,}")
+    print("\nNote: a hot key serializes on one stripe lock; spread keys scale with")
+    print("processes until stripes or cores run out.")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="rate limiter benchmarks")
+    parser.add_argument("--keys", type=int, default=10_000_000, help="distinct keys for the memory run")
+    parser.add_argument("--ops", type=int, default=200_000, help="allow() calls per thread")
+    parser.add_argument("--engine-keys", type=int, default=1_000_000, help="keys for the engine comparison")
+    parser.add_argument("--decisions", type=int, default=200_000, help="decisions per batch-size row")
+    parser.add_argument("--procs", type=int, default=8, help="max processes for the shared-memory run")
+    parser.add_argument("--proc-ops", type=int, default=100_000, help="allow() calls per process")
+    args = parser.parse_args()
+    bench_memory(args.keys)
+    bench_threads(args.ops)
+    bench_engines(args.engine_keys)
+    bench_batch(args.decisions)
+    bench_shared(args.procs, args.proc_ops)
+
+
+if __name__ == "__main__":
+    main()
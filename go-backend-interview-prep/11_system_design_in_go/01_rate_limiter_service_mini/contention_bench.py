@@ -0,0 +1,289 @@
+"""Contention benchmark suite for every rate limiter in the repo.
+
+Each limiter is loaded from its lesson file (they are all named main.py,
+so importlib loads them under distinct names) and driven through one
+adapter shape: make() -> object with allow(key) -> bool.
+
+  11/01 token bucket   RateLimiter        (sharded, idle reclamation)
+  11/01 gcra           GCRALimiter        (one float per key)
+  11/01 shared memory  SharedLimiter      (one table for all processes)
+  11/07 sliding window gateway RateLimiter(mode="sliding")
+  08/09 registry       LimiterRegistry    (lazy-refill TokenBucket per key)
+  06/10 async          AsyncLimiter.try_acquire per key, behind a lock
+                       (it is built for one event loop, not threads)
+
+All are configured as ~1000 decisions/sec per key with a burst of 10.
+Key patterns: uniform over --key-space keys, Zipf (s=1.1) over the same
+keys, and all-distinct (every decision is a new key).
+
+Reports decisions/sec, p99 decision latency (every call is timed) and
+bytes retained per key (tracemalloc after --memory-keys distinct keys),
+prints a table and writes JSON for comparing runs.
+
+Run: python3 ./11_system_design_in_go/01_rate_limiter_service_mini/contention_bench.py --out results.json
+"""
+
+import argparse
+import importlib.util
+import json
+import multiprocessing as mp
+import os
+import platform
+import random
+import sys
+import threading
+import time
+import tracemalloc
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[2]  # go-backend-interview-prep/
+RATE = 1000  # tokens per second per key
+BURST = 10
+PATTERNS = ("uniform", "zipf", "distinct")
+_modules = {}
+
+
+def load(rel_path: str):
+    """Import a lesson's main.py under a unique module name."""
+    if rel_path not in _modules:
+        path = ROOT / rel_path
+        name = "bench_" + rel_path.replace("/", "_").removesuffix(".py")
+        spec = importlib.util.spec_from_file_location(name, path)
+        mod = importlib.util.module_from_spec(spec)
+        sys.path.insert(0, str(path.parent))  # for sibling imports
+        try:
+            spec.loader.exec_module(mod)
+        finally:
+            sys.path.pop(0)
+        _modules[rel_path] = mod
+    return _modules[rel_path]
+
+
+# --- Adapters ---
+
+class KeyedAsyncLimiter:
+    """One AsyncLimiter per key; a lock makes try_acquire thread-safe."""
+
+    def __init__(self):
+        self.cls = load("06_concurrency/10_rate_limiting/main.py").AsyncLimiter
+        self.lock = threading.Lock()
+        self.limiters = {}
+
+    def allow(self, key):
+        with self.lock:
+            lim = self.limiters.get(key)
+            if lim is None:
+                lim = self.limiters[key] = self.cls(RATE, BURST)
+            return lim.try_acquire()
+
+
+def make_token_bucket():
+    return load("11_system_design_in_go/01_rate_limiter_service_mini/main.py").RateLimiter(RATE, BURST)
+
+
+def make_gcra():
+    return load("11_system_design_in_go/01_rate_limiter_service_mini/main.py").GCRALimiter(RATE, BURST)
+
+
+def make_shared():
+    mod = load("11_system_design_in_go/01_rate_limiter_service_mini/shm_limiter.py")
+    return mod.SharedLimiter(RATE, BURST)
+
+
+def make_sliding():
+    mod = load("11_system_design_in_go/07_api_gateway_basics_mini/main.py")
+    return mod.RateLimiter(limit=BURST, window_sec=BURST / RATE, mode="sliding")
+
+
+def make_registry():
+    mod = load("08_http_and_backend/09_rate_limit_basics/main.py")
+    return mod.LimiterRegistry(max_tokens=BURST, refill_interval=BURST / RATE)
+
+
+LIMITERS = {
+    "11/01 token bucket": make_token_bucket,
+    "11/01 gcra": make_gcra,
+    "11/01 shared memory": make_shared,
+    "11/07 sliding window": make_sliding,
+    "08/09 registry": make_registry,
+    "06/10 async": KeyedAsyncLimiter,
+}
+SHARED = {"11/01 shared memory"}  # one instance spans processes
+
+
+def release(limiter) -> None:
+    if hasattr(limiter, "close"):
+        limiter.close()
+
+
+# --- Workloads ---
+
+def make_keys(pattern: str, n: int, key_space: int, seed: int) -> list:
+    rng = random.Random(seed)
+    if pattern == "uniform":
+        return [f"k{rng.randrange(key_space)}" for _ in range(n)]
+    if pattern == "zipf":
+        weights, total = [], 0.0
+        for rank in range(1, key_space + 1):
+            total += 1.0 / rank ** 1.1
+            weights.append(total)
+        ranks = rng.choices(range(key_space), cum_weights=weights, k=n)
+        return [f"k{r}" for r in ranks]
+    return [f"d{seed}:{i}" for i in range(n)]  # distinct
+
+
+def drive(limiter, keys: list) -> tuple:
+    """Run every key through allow(); returns (latencies ns, allowed)."""
+    allow = limiter.allow
+    clock = time.perf_counter_ns
+    lat = [0] * len(keys)
+    allowed = 0
+    for i, key in enumerate(keys):
+        t0 = clock()
+        allowed += allow(key)
+        lat[i] = clock() - t0
+    return lat, allowed
+
+
+def summarize(name, pattern, mode, workers, wall, runs) -> dict:
+    """wall is measured by the parent from barrier release to the last
+    worker finishing; per-worker clocks would overlap serialized runs."""
+    lat = sorted(x for r in runs for x in r[0])
+    total = len(lat)
+    return {
+        "limiter": name,
+        "pattern": pattern,
+        "mode": mode,
+        "workers": workers,
+        "decisions": total,
+        "decisions_per_sec": round(total / wall),
+        "p99_us": round(lat[min(total - 1, int(total * 0.99))] / 1000, 2),
+        "allowed_ratio": round(sum(r[1] for r in runs) / total, 4),
+    }
+
+
+def run_threads(name, pattern, threads, ops, key_space) -> dict:
+    limiter = LIMITERS[name]()
+    key_lists = [make_keys(pattern, ops, key_space, seed=w) for w in range(threads)]
+    gate = threading.Barrier(threads + 1)
+    runs = [None] * threads
+
+    def worker(w):
+        gate.wait()
+        runs[w] = drive(limiter, key_lists[w])
+
+    pool = [threading.Thread(target=worker, args=(w,)) for w in range(threads)]
+    for t in pool:
+        t.start()
+    gate.wait()
+    start = time.perf_counter()
+    for t in pool:
+        t.join()
+    wall = time.perf_counter() - start
+    release(limiter)
+    return summarize(name, pattern, "threads", threads, wall, runs)
+
+
+def proc_worker(name, limiter, pattern, w, ops, key_space, gate, results) -> None:
+    # Private limiters are built per process, as N service workers would
+    if limiter is None:
+        limiter = LIMITERS[name]()
+    keys = make_keys(pattern, ops, key_space, seed=w)
+    gate.wait()
+    results.put(drive(limiter, keys))
+    release(limiter)  # a shared table is only unlinked by its creator
+
+
+def run_procs(name, pattern, procs, ops, key_space) -> dict:
+    shared = LIMITERS[name]() if name in SHARED else None
+    gate, results = mp.Barrier(procs + 1), mp.Queue()
+    pool = [mp.Process(target=proc_worker,
+                       args=(name, shared, pattern, w, ops, key_space, gate, results))
+            for w in range(procs)]
+    for p in pool:
+        p.start()
+    gate.wait()
+    start = time.perf_counter()
+    runs = [results.get() for _ in pool]  # each arrives as its worker finishes
+    wall = time.perf_counter() - start
+    for p in pool:
+        p.join()
+    if shared is not None:
+        release(shared)
+    return summarize(name, pattern, "procs", procs, wall, runs)
+
+
+def bytes_per_key(name, keys: int) -> dict:
+    """Heap retained per distinct key seen. Limiters that reclaim idle keys
+    keep only recently active ones, so they report far less than the raw
+    per-key cost. SharedLimiter lives outside the heap, so its fixed table
+    size per slot is reported instead."""
+    if name in SHARED:
+        limiter = LIMITERS[name]()
+        slots = limiter.stripes * limiter.slots_per_stripe
+        per_key = limiter.shm.size / slots
+        release(limiter)
+        return {"limiter": name, "keys": slots, "bytes_per_key": round(per_key, 1),
+                "note": "preallocated shared-memory slot"}
+    LIMITERS[name]()  # load the module before tracing
+    tracemalloc.start()
+    base = tracemalloc.get_traced_memory()[0]
+    limiter = LIMITERS[name]()
+    allow = limiter.allow
+    for i in range(keys):
+        allow(f"m{i}")
+    grown = tracemalloc.get_traced_memory()[0] - base
+    tracemalloc.stop()
+    del limiter, allow
+    return {"limiter": name, "keys": keys, "bytes_per_key": round(grown / keys, 1)}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="rate limiter contention benchmarks")
+    parser.add_argument("--limiters", nargs="+", default=list(LIMITERS), choices=list(LIMITERS),
+                        metavar="NAME", help=f"subset of: {', '.join(LIMITERS)}")
+    parser.add_argument("--patterns", nargs="+", default=list(PATTERNS), choices=PATTERNS)
+    parser.add_argument("--threads", type=int, nargs="+", default=[1, 2, 4, 8, 16, 32, 64])
+    parser.add_argument("--procs", type=int, nargs="*", default=[1, 2, 4, 8],
+                        help="process counts for multiprocess mode (empty to skip)")
+    parser.add_argument("--ops", type=int, default=20_000, help="decisions per worker")
+    parser.add_argument("--key-space", type=int, default=10_000)
+    parser.add_argument("--memory-keys", type=int, default=100_000)
+    parser.add_argument("--out", default="ratelimit_bench.json")
+    args = parser.parse_args()
+
+    results, memory = [], []
+    print(f"  {'limiter':<21} {'pattern':<9} {'mode':<8} {'n':>3} {'decisions/s':>12} {'p99':>10} {'allowed':>8}")
+    for name in args.limiters:
+        for pattern in args.patterns:
+            runs = [("threads", n) for n in args.threads] + [("procs", n) for n in args.procs]
+            for mode, n in runs:
+                run = run_threads if mode == "threads" else run_procs
+                r = run(name, pattern, n, args.ops, args.key_space)
+                results.append(r)
+                print(f"  {name:<21} {pattern:<9} {mode:<8} {n:>3} {r['decisions_per_sec']:>12,} "
+                      f"{r['p99_us']:>7.1f} us {r['allowed_ratio']:>8.1%}")
+        memory.append(bytes_per_key(name, args.memory_keys))
+        print(f"  {name:<21} memory: {memory[-1]['bytes_per_key']} B/key\n")
+
+    report = {
+        "meta": {
+            "python": platform.python_version(),
+            "implementation": platform.python_implementation(),
+            "cpus": os.cpu_count(),
+            "ops_per_worker": args.ops,
+            "key_space": args.key_space,
+            "rate": RATE,
+            "burst": BURST,
+            "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        },
+        "results": results,
+        "memory": memory,
+    }
+    with open(args.out, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"wrote {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,8 +1,10 @@
 """Rate limiter service -- Python equivalent using token bucket."""
 
 import json
+import math
 import threading
 import time
+from collections import OrderedDict, namedtuple
 from http.server import HTTPServer, BaseHTTPRequestHandler
 from urllib.request import urlopen, Request
 from urllib.error import URLError
@@ -11,14 +13,17 @@ from urllib.error import URLError
 # --- Token Bucket ---
 
 class Bucket:
-    def __init__(self, max_tokens, refill_rate):
+    __slots__ = ("tokens", "max_tokens", "refill_rate", "last_refill")
+
+    def __init__(self, max_tokens, refill_rate, now=None):
         self.tokens = max_tokens
         self.max_tokens = max_tokens
         self.refill_rate = refill_rate  # tokens per second
-        self.last_refill = time.time()
+        self.last_refill = time.time() if now is None else now
 
-    def allow(self):
-        now = time.time()
+    def allow(self, now=None):
+        if now is None:
+            now = time.time()
         elapsed = now - self.last_refill
         self.tokens += elapsed * self.refill_rate
         if self.tokens > self.max_tokens:
@@ -33,39 +38,162 @@ class Bucket:
 
 # --- Rate Limiter ---
 
-class RateLimiter:
-    def __init__(self, refill_rate, max_tokens):
+IDLE_SCAN = 2  # max idle buckets reclaimed per allow() call
+
+
+class _Shard:
+    def __init__(self, table=OrderedDict):
         self.lock = threading.Lock()
-        self.buckets = {}
+        self.entries = table()  # key -> state, least recently used first
+
+
+class RateLimiter:
+    """Per-key token buckets, lock-striped across shards.
+
+    A bucket untouched for idle_horizon (= max_tokens / refill_rate) seconds
+    has refilled to max_tokens, so dropping it is indistinguishable from
+    keeping it. Each allow() reclaims up to IDLE_SCAN such buckets from the
+    cold end of its shard, so memory tracks active keys, not keys ever seen.
+    """
+
+    def __init__(self, refill_rate, max_tokens, shards=16, reclaim_idle=True):
+        self.shards = [_Shard() for _ in range(shards)]
+        self.max_tokens = max_tokens
+        self.refill_rate = refill_rate
+        self.idle_horizon = max_tokens / refill_rate
+        self.reclaim_idle = reclaim_idle
+
+    def allow(self, key):
+        shard = self.shards[hash(key) % len(self.shards)]
+        with shard.lock:
+            now = time.time()
+            buckets = shard.entries
+            b = buckets.get(key)
+            if b is None:
+                b = buckets[key] = Bucket(self.max_tokens, self.refill_rate, now)
+            else:
+                buckets.move_to_end(key)
+            allowed = b.allow(now)
+            if self.reclaim_idle:
+                self._reclaim(buckets, now)
+            return allowed
+
+    def _reclaim(self, buckets, now):
+        """Drop idle buckets from the cold end. Caller must hold the shard lock."""
+        cutoff = now - self.idle_horizon
+        for _ in range(IDLE_SCAN):
+            key, b = next(iter(buckets.items()))
+            if b.last_refill >= cutoff:
+                return  # ordered by last use: everything after is newer
+            del buckets[key]
+
+    def size(self):
+        """Number of live buckets across all shards."""
+        total = 0
+        for shard in self.shards:
+            with shard.lock:
+                total += len(shard.entries)
+        return total
+
+
+# --- GCRA (generic cell rate algorithm) ---
+
+Decision = namedtuple("Decision", "allowed remaining retry_after")
+
+
+class GCRALimiter:
+    """Token-bucket-equivalent limits with one float of state per key.
+
+    Each key stores only its theoretical arrival time (TAT): when the next
+    request would arrive if requests came exactly at refill_rate. A request
+    is allowed if it is no earlier than TAT minus the burst tolerance
+    (max_tokens emission intervals). A TAT at or before now means the key
+    is at full burst, so it is dropped just like an idle Bucket: keys are
+    kept in last-update order and reclaimed from the cold end.
+    Uses time.monotonic(), so wall-clock jumps cannot refill or drain keys.
+    """
+
+    def __init__(self, refill_rate, max_tokens, shards=16, reclaim_idle=True):
+        self.shards = [_Shard() for _ in range(shards)]
         self.max_tokens = max_tokens
         self.refill_rate = refill_rate
+        self.interval = 1.0 / refill_rate  # seconds per token
+        self.tolerance = max_tokens * self.interval
+        self.reclaim_idle = reclaim_idle
 
     def allow(self, key):
-        with self.lock:
-            if key not in self.buckets:
-                self.buckets[key] = Bucket(self.max_tokens, self.refill_rate)
-            return self.buckets[key].allow()
+        return self._spend(key, 1)[2]
+
+    def check(self, key, cost=1):
+        """Spend cost tokens if available. Returns a Decision; retry_after
+        is seconds until the request would be allowed (0.0 if it was)."""
+        now, tat, allowed = self._spend(key, cost)
+        remaining = int((now + self.tolerance - tat) / self.interval + 1e-9)
+        if allowed:
+            return Decision(True, remaining, 0.0)
+        return Decision(False, remaining, tat + cost * self.interval - self.tolerance - now)
+
+    def _spend(self, key, cost):
+        """Returns (now, TAT after the decision, allowed)."""
+        shard = self.shards[hash(key) % len(self.shards)]
+        with shard.lock:
+            now = time.monotonic()
+            tats = shard.entries
+            tat = tats.get(key, now)
+            if tat < now:
+                tat = now
+            new_tat = tat + cost * self.interval
+            if new_tat - self.tolerance > now:
+                return now, tat, False  # denied: state unchanged
+            if key in tats:
+                tats.move_to_end(key)
+            tats[key] = new_tat
+            if self.reclaim_idle:
+                self._reclaim(tats, now)
+            return now, new_tat, True
+
+    def _reclaim(self, tats, now):
+        """Drop keys back at full burst from the cold end. Caller holds the lock.
+
+        A TAT is at most tolerance ahead of its last update, so a limited
+        key at the head holds back reclamation for at most that long."""
+        for _ in range(IDLE_SCAN):
+            key, tat = next(iter(tats.items()))
+            if tat > now:
+                return
+            tats.popitem(last=False)
+
+    def size(self):
+        """Number of keys holding state across all shards."""
+        total = 0
+        for shard in self.shards:
+            with shard.lock:
+                total += len(shard.entries)
+        return total
 
 
 # --- Handler with rate limit ---
 
-limiter = RateLimiter(refill_rate=2, max_tokens=5)
+limiter = GCRALimiter(refill_rate=2, max_tokens=5)
 
 
 class Handler(BaseHTTPRequestHandler):
     def do_GET(self):
         if self.path == "/ping":
             key = self.client_address[0]
-            if not limiter.allow(key):
+            d = limiter.check(key)
+            if not d.allowed:
                 self.send_response(429)
                 self.send_header("Content-Type", "application/json")
-                self.send_header("Retry-After", "1")
+                self.send_header("Retry-After", str(math.ceil(d.retry_after)))
+                self.send_header("X-RateLimit-Remaining", str(d.remaining))
                 self.end_headers()
                 self.wfile.write(json.dumps({"error": "rate limit exceeded"}).encode())
                 return
 
             self.send_response(200)
             self.send_header("Content-Type", "application/json")
+            self.send_header("X-RateLimit-Remaining", str(d.remaining))
             self.end_headers()
             self.wfile.write(json.dumps({"message": "pong"}).encode())
         else:
@@ -85,10 +213,12 @@ def run_demo():
             req = Request("http://localhost:9001/ping")
             resp = urlopen(req, timeout=2)
             body = json.loads(resp.read())
-            print(f"req {i}: status={resp.status} body={body}")
+            remaining = resp.headers["X-RateLimit-Remaining"]
+            print(f"req {i}: status={resp.status} remaining={remaining} body={body}")
         except URLError as e:
             if hasattr(e, "code"):
-                print(f"req {i}: status={e.code} body=rate limit exceeded")
+                retry = e.headers["Retry-After"]
+                print(f"req {i}: status={e.code} retry-after={retry}s body=rate limit exceeded")
             else:
                 print(f"req {i}: error: {e}")
 
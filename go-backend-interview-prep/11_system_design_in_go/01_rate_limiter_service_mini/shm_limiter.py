@@ -0,0 +1,171 @@
+"""Cross-process token buckets on multiprocessing.shared_memory.
+
+When the service runs as N worker processes, each private RateLimiter
+enforces the full limit and the host admits N times the configured rate.
+SharedLimiter keeps the token table in one SharedMemory block so every
+worker debits the same bucket per key.
+
+Layout: stripes x slots_per_stripe fixed 24-byte slots
+  key hash (u64, 0 = empty), tokens (f64), last refill (f64, monotonic)
+
+A key hashes (stable blake2b, not the per-process str hash) to a stripe
+and a home slot inside it; open addressing probes up to PROBE_LIMIT slots
+within the stripe. Each stripe has its own lock, so the read-refill-debit
+of one bucket is atomic with respect to every process, while keys in
+different stripes never wait on each other. Only the 64-bit hash is stored:
+two keys colliding on it would share a bucket (odds ~n^2 / 2^65).
+
+When a probe window is full, a bucket that has refilled to max_tokens is
+reused first (dropping it changes nothing, as in RateLimiter), else the
+least recently refilled one.
+
+Run: python3 ./11_system_design_in_go/01_rate_limiter_service_mini/shm_limiter.py
+"""
+
+import hashlib
+import multiprocessing as mp
+import os
+import struct
+import time
+from multiprocessing import shared_memory
+
+_SLOT = struct.Struct("<Qdd")  # key hash, tokens, last refill
+EMPTY = 0
+PROBE_LIMIT = 16
+
+
+def _hash(key):
+    kb = key.encode() if isinstance(key, str) else bytes(key)
+    h = int.from_bytes(hashlib.blake2b(kb, digest_size=8).digest(), "little")
+    return h or 1  # 0 marks an empty slot
+
+
+class SharedLimiter:
+    """allow(key) over a token table shared by every process on the host.
+
+    Create it once in the parent, then pass it to worker processes as a
+    Process argument; workers attach to the same memory and locks.
+    time.monotonic() is system-wide on Linux, so all processes agree on it.
+    """
+
+    def __init__(self, refill_rate, max_tokens, stripes=64, slots_per_stripe=4096):
+        self.refill_rate = refill_rate
+        self.max_tokens = max_tokens
+        self.stripes = stripes
+        self.slots_per_stripe = slots_per_stripe
+        size = stripes * slots_per_stripe * _SLOT.size
+        self.shm = shared_memory.SharedMemory(create=True, size=size)
+        self.shm.buf[:size] = bytes(size)  # all EMPTY
+        self.locks = [mp.Lock() for _ in range(stripes)]
+        self.owner_pid = os.getpid()  # forked children inherit this object
+
+    # --- process handoff ---
+
+    def __getstate__(self):
+        # Locks pickle only while a child process is being spawned
+        return {
+            "name": self.shm.name,
+            "locks": self.locks,
+            "refill_rate": self.refill_rate,
+            "max_tokens": self.max_tokens,
+            "stripes": self.stripes,
+            "slots_per_stripe": self.slots_per_stripe,
+        }
+
+    def __setstate__(self, state):
+        self.refill_rate = state["refill_rate"]
+        self.max_tokens = state["max_tokens"]
+        self.stripes = state["stripes"]
+        self.slots_per_stripe = state["slots_per_stripe"]
+        self.locks = state["locks"]
+        self.shm = shared_memory.SharedMemory(name=state["name"])
+        self.owner_pid = None
+
+    def close(self):
+        """Detach; the creating process also frees the memory."""
+        self.shm.close()
+        if self.owner_pid == os.getpid():
+            self.shm.unlink()
+
+    # --- public API (same shape as RateLimiter) ---
+
+    def allow(self, key, cost=1):
+        h = _hash(key)
+        stripe = h % self.stripes
+        n = self.slots_per_stripe
+        base = stripe * n
+        home = (h // self.stripes) % n
+        buf = self.shm.buf
+        rate, cap = self.refill_rate, self.max_tokens
+        with self.locks[stripe]:
+            now = time.monotonic()
+            target = None
+            reuse = None  # first slot whose bucket is full again
+            oldest, oldest_at = None, float("inf")
+            for i in range(min(PROBE_LIMIT, n)):
+                off = (base + (home + i) % n) * _SLOT.size
+                sh, tokens, last = _SLOT.unpack_from(buf, off)
+                if sh == h:
+                    target = off
+                    tokens = min(cap, tokens + (now - last) * rate)
+                    break
+                if sh == EMPTY:
+                    break  # key cannot be further along the chain
+                if reuse is None and tokens + (now - last) * rate >= cap:
+                    reuse = off
+                if last < oldest_at:
+                    oldest, oldest_at = off, last
+            if target is None:
+                # New key: take the empty slot, else an idle or the oldest one
+                if sh == EMPTY:
+                    target = off
+                else:
+                    target = reuse if reuse is not None else oldest
+                tokens = cap
+            allowed = tokens >= cost
+            if allowed:
+                tokens -= cost
+            _SLOT.pack_into(buf, target, h, tokens, now)
+            return allowed
+
+    def size(self):
+        """Count occupied slots (O(slots): scans the whole table)."""
+        buf = self.shm.buf
+        used = 0
+        for stripe in range(self.stripes):
+            with self.locks[stripe]:
+                base = stripe * self.slots_per_stripe
+                for slot in range(base, base + self.slots_per_stripe):
+                    if _SLOT.unpack_from(buf, slot * _SLOT.size)[0] != EMPTY:
+                        used += 1
+        return used
+
+
+# --- Demo ---
+
+def worker(limiter, wid, results):
+    allowed = sum(limiter.allow("client:42") for _ in range(100))
+    results.put((wid, allowed))
+    limiter.close()
+
+
+def main():
+    limiter = SharedLimiter(refill_rate=1, max_tokens=50)
+    print("=== shared-memory limiter demo (4 processes, one key, burst 50) ===\n")
+    results = mp.Queue()
+    procs = [mp.Process(target=worker, args=(limiter, w, results)) for w in range(4)]
+    for p in procs:
+        p.start()
+    for p in procs:
+        p.join()
+    total = 0
+    for wid, allowed in sorted(results.get() for _ in procs):
+        print(f"worker {wid}: {allowed}/100 allowed")
+        total += allowed
+    print(f"\ntotal allowed: {total} (one shared budget, not 4 x 50)")
+    limiter.close()
+    print("\ndemo done")
+
+
+if __name__ == "__main__":
+    main()
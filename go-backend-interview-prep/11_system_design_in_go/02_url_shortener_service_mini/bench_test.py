@@ -0,0 +1,167 @@
+"""URL shortener benchmarks -- Python equivalent of a Go bench_test.go.
+
+- Code allocation with N URLs already stored (default 10M, --urls):
+  random code + store.exists retry loop vs leased-block IDAllocator,
+  single thread and 4 threads
+- LogStore: saves/sec with 1 vs 16 writers (group commit), reopen time
+  from a full scan vs a checkpoint, and index bytes per URL vs MemoryStore
+- Redirect path: server-side cost of building a GET /r/{code} response vs
+  a ResponseCache hit (redirect_loadgen.py measures it over sockets)
+- Dedup: bytes per URL and lookup cost of the DedupIndex digest table vs
+  a dict keyed by URL string
+Run: python ./11_system_design_in_go/02_url_shortener_service_mini/bench_test.py --urls 1000000
+"""
+
+import argparse
+import os
+import shutil
+import tempfile
+import threading
+import time
+import timeit
+import tracemalloc
+
+from log_store import LogStore
+from main import (CHARSET, DedupIndex, IDAllocator, MemoryStore, ResponseCache, encode_base62,
+                  encode_redirect, generate_code, generate_unique_code)
+
+URL = "https://example.com/some/long/path"
+
+
+def filled_store(urls: int) -> MemoryStore:
+    """Prefill with random 6-char codes: the keyspace generate_unique_code
+    probes, so its exists() checks can actually collide."""
+    store = MemoryStore()
+    store.urls.update((generate_code(6), URL) for _ in range(urls))
+    return store
+
+
+def shorten_rate(store, shorten, threads: int, ops: int) -> float:
+    """Codes allocated and saved per second across all threads."""
+    gate = threading.Barrier(threads + 1)
+
+    def worker():
+        gate.wait()
+        for _ in range(ops):
+            store.save(shorten(), URL)
+
+    pool = [threading.Thread(target=worker) for _ in range(threads)]
+    for t in pool:
+        t.start()
+    gate.wait()
+    start = time.perf_counter()
+    for t in pool:
+        t.join()
+    return threads * ops / (time.perf_counter() - start)
+
+
+def bench_allocation(urls: int, ops: int) -> None:
+    print(f"=== shorten: codes/sec with {urls:,} URLs stored, {ops:,} per thread ===\n")
+    store = filled_store(urls)
+    ids = IDAllocator()  # 7-char codes never meet the 6-char prefill
+    scrambled = IDAllocator(scramble_key=0x2F6A9C3E51)
+    print(f"  {'threads':>7}  {'random+exists':>14}  {'allocator':>10}  {'scrambled':>10}")
+    for threads in (1, 4):
+        rnd = shorten_rate(store, lambda: generate_unique_code(store), threads, ops)
+        seq = shorten_rate(store, ids.next_code, threads, ops)
+        scr = shorten_rate(store, scrambled.next_code, threads, ops)
+        print(f"  {threads:>7}  {rnd:>14,.0f}  {seq:>10,.0f}  {scr:>10,.0f}")
+    print(f"\n  store size after run: {len(store.urls):,}")
+    print(f"  6-char keyspace occupied by the prefill: {urls / len(CHARSET) ** 6:.2e} "
+          f"(chance a random code needs a retry)")
+
+
+def bench_log_store(urls: int) -> None:
+    print(f"\n=== LogStore: {urls:,} URLs ===\n")
+    path = tempfile.mkdtemp(prefix="urllog-bench-")
+    store = LogStore(path)
+    for writers in (1, 16):
+        per = 2000 // writers
+        rate = shorten_rate(store, IDAllocator(start=writers << 32).next_code, writers, per)
+        print(f"  save, {writers:>2} writers: {rate:>9,.0f}/sec  (one fsync per commit batch)")
+
+    for lo in range(0, urls, 10_000):
+        store.save_many((encode_base62(i), URL) for i in range(lo, min(urls, lo + 10_000)))
+    st = store.stats()
+    store.close()
+
+    start = time.perf_counter()
+    LogStore(path).close(checkpoint=False)
+    from_ckpt = time.perf_counter() - start
+    os.remove(os.path.join(path, "index.ckpt"))
+    start = time.perf_counter()
+    LogStore(path).close(checkpoint=False)
+    from_scan = time.perf_counter() - start
+    print(f"  reopen: checkpoint {from_ckpt*1000:,.0f} ms, full scan {from_scan*1000:,.0f} ms")
+
+    tracemalloc.start()
+    mem = MemoryStore()
+    for i in range(urls):
+        mem.save(encode_base62(i), f"{URL}/{i}")
+    dict_bytes = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    print(f"  memory per URL: LogStore index {st['index_bytes'] / st['codes']:.1f} B, "
+          f"MemoryStore {dict_bytes / urls:.1f} B")
+    shutil.rmtree(path)
+
+
+def bench_redirect_path() -> None:
+    print("\n=== redirect response: build per request vs cached bytes ===\n")
+    store = MemoryStore()
+    store.save("aBc1234", "https://example.com/some/long/path?utm_source=newsletter")
+    cache = ResponseCache(capacity=10_000)
+    cache.put("aBc1234", encode_redirect("aBc1234", store.load("aBc1234"), "json"))
+    runs = 200_000
+    for mode in ("json", "302"):
+        build = min(timeit.repeat(
+            lambda: encode_redirect("aBc1234", store.load("aBc1234"), mode), number=runs, repeat=3))
+        print(f"  build ({mode:>4}): {build / runs * 1e9:>6.0f} ns")
+    hit = min(timeit.repeat(lambda: cache.get("aBc1234"), number=runs, repeat=3))
+    print(f"  cache hit:    {hit / runs * 1e9:>6.0f} ns")
+
+
+def bench_dedup(urls: int) -> None:
+    print(f"\n=== dedup reverse index: {urls:,} URLs ===\n")
+    # URLs exist anyway (in the store); only the index itself is measured
+    pairs = [(encode_base62(i), f"{URL}/{i}?ref=campaign") for i in range(urls)]
+
+    tracemalloc.start()
+    index = DedupIndex()
+    index.add_many(pairs)
+    table = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+
+    tracemalloc.start()
+    reverse = {}
+    for code, url in pairs:
+        reverse[url] = code
+    dict_bytes = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    url_bytes = sum(len(u) + 49 for _, u in pairs)  # str objects a dict would also keep alive
+
+    probe = [u for _, u in pairs[:: max(1, urls // 10_000)]]
+    t_index = timeit.timeit(lambda: index.get_many(probe), number=5)
+    t_dict = timeit.timeit(lambda: [reverse.get(u) for u in probe], number=5)
+    n = 5 * len(probe)
+    print(f"  {'':<34} {'B/URL':>8} {'lookup':>9}")
+    print(f"  {'DedupIndex (128-bit digests)':<34} {table / urls:>8.1f} {t_index / n * 1e9:>6.0f} ns")
+    print(f"  {'dict, URL str shared with store':<34} {dict_bytes / urls:>8.1f} {t_dict / n * 1e9:>6.0f} ns")
+    print(f"  {'dict, own URL str (LogStore mode)':<34} {(dict_bytes + url_bytes) / urls:>8.1f}")
+    print("\n  DedupIndex hashes every lookup (blake2b) and never holds URL text,")
+    print("  so its size does not grow with URL length.")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="url shortener benchmarks")
+    parser.add_argument("--urls", type=int, default=10_000_000, help="URLs stored before timing")
+    parser.add_argument("--ops", type=int, default=200_000, help="shortens per thread")
+    parser.add_argument("--store-urls", type=int, default=1_000_000, help="URLs for the LogStore run")
+    args = parser.parse_args()
+    bench_allocation(args.urls, args.ops)
+    bench_log_store(args.store_urls)
+    bench_redirect_path()
+    bench_dedup(args.store_urls)
+
+
+if __name__ == "__main__":
+    main()
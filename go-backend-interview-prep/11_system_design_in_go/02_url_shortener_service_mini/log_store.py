@@ -0,0 +1,427 @@
+"""Durable append-only URL store -- segment files, hash index, mmap reads.
+
+Same save/load/exists API as MemoryStore, but URLs survive restarts and
+are not kept as Python str objects.
+
+On disk (one directory):
+  seg-000001.log ...  records: crc32, code len, url len, code, url
+  index.ckpt          optional index checkpoint (written on close)
+
+In memory, an open-addressing table (two array('Q') columns, linear
+probing) maps a 64-bit hash of each code to (segment << 40 | offset).
+Reads look the hash up, confirm the code bytes in the mmapped segment and
+hand back a memoryview of the URL bytes -- no copy until the caller
+decodes it.
+
+Writes are group-committed: save() queues its record and waits; one
+committer thread writes everything queued since the last commit with a
+single write() + fsync(), so N concurrent writers share one fsync.
+
+On open the index is loaded from the checkpoint (if present and valid)
+and only segment data written after it is scanned; otherwise every
+segment is scanned. A torn record at the tail (crash mid-write) is
+truncated away.
+
+Run: python3 ./11_system_design_in_go/02_url_shortener_service_mini/log_store.py
+"""
+
+import hashlib
+import mmap
+import os
+import shutil
+import struct
+import tempfile
+import threading
+import time
+import zlib
+from array import array
+
+_REC = struct.Struct("<IHI")  # crc32(code + url), code length, url length
+_CKPT = struct.Struct("<8sIQQQ")  # magic, segment, offset, slots, count
+CKPT_MAGIC = b"GBURLIX1"
+SEGMENT_BYTES = 64 << 20
+OFFSET_BITS = 40
+OFFSET_MASK = (1 << OFFSET_BITS) - 1
+INITIAL_SLOTS = 1 << 16
+MAX_LOAD = 0.7
+
+
+def _hash(code_b):
+    h = int.from_bytes(hashlib.blake2b(code_b, digest_size=8).digest(), "little")
+    return h or 1  # 0 marks an empty slot
+
+
+class _Index:
+    """Open-addressing hash table: code hash -> packed record location.
+
+    Only the hash is stored, so callers pass matches(loc) to confirm that
+    the record at loc really holds their code.
+    """
+
+    def __init__(self, slots=INITIAL_SLOTS):
+        self.hashes = array("Q", bytes(8 * slots))
+        self.locs = array("Q", bytes(8 * slots))
+        self.mask = slots - 1
+        self.count = 0
+
+    def get(self, h, matches):
+        hashes, mask = self.hashes, self.mask
+        i = h & mask
+        while True:
+            sh = hashes[i]
+            if sh == 0:
+                return None
+            if sh == h and matches(self.locs[i]):
+                return self.locs[i]
+            i = (i + 1) & mask
+
+    def put(self, h, loc, matches):
+        if (self.count + 1) > MAX_LOAD * (self.mask + 1):
+            self._grow()
+        hashes, mask = self.hashes, self.mask
+        i = h & mask
+        while True:
+            sh = hashes[i]
+            if sh == 0:
+                hashes[i] = h
+                self.locs[i] = loc
+                self.count += 1
+                return
+            if sh == h and matches(self.locs[i]):
+                self.locs[i] = loc  # code saved again: newest record wins
+                return
+            i = (i + 1) & mask
+
+    def _grow(self):
+        old_h, old_l, count = self.hashes, self.locs, self.count
+        self.__init__((self.mask + 1) * 2)
+        hashes, locs, mask = self.hashes, self.locs, self.mask
+        for h, loc in zip(old_h, old_l):
+            if h:
+                i = h & mask
+                while hashes[i]:
+                    i = (i + 1) & mask
+                hashes[i] = h
+                locs[i] = loc
+        self.count = count
+
+    def nbytes(self):
+        return (self.mask + 1) * 16
+
+
+class LogStore:
+    def __init__(self, path, segment_bytes=SEGMENT_BYTES):
+        os.makedirs(path, exist_ok=True)
+        self.path = path
+        self.segment_bytes = segment_bytes
+        self.index_lock = threading.Lock()  # index + mmaps
+        self.cv = threading.Condition()  # pending queue + commit progress
+        self.pending = []
+        self.queued = 0  # records ever queued
+        self.durable = 0  # records ever committed
+        self.commits = 0  # write+fsync batches
+        self.error = None
+        self.closed = False
+        self.maps = {}  # segment -> read-only mmap
+        self.index = _Index()
+        self.recovered_from = "empty"
+        self._recover()
+        self.committer = threading.Thread(target=self._commit_loop, daemon=True)
+        self.committer.start()
+
+    # --- public API (same shape as MemoryStore) ---
+
+    def save(self, code, url):
+        self.save_many([(code, url)])
+
+    def save_many(self, pairs):
+        """Queue (code, url) pairs together; returns once all are durable."""
+        records = [(code.encode(), url.encode()) for code, url in pairs]
+        with self.cv:
+            if self.closed:
+                raise ValueError("store is closed")
+            self.pending.extend(records)
+            self.queued += len(records)
+            mine = self.queued
+            self.cv.notify_all()
+            while self.durable < mine and self.error is None:
+                self.cv.wait()
+            if self.error is not None:
+                raise OSError("log write failed") from self.error
+
+    def load(self, code):
+        view = self.load_view(code)
+        return None if view is None else str(view, "utf-8")
+
+    def load_view(self, code):
+        """URL bytes as a memoryview into the segment mmap (no copy)."""
+        cb = code.encode()
+        with self.index_lock:
+            loc = self.index.get(_hash(cb), lambda loc: self._code_at(loc) == cb)
+            if loc is None:
+                return None
+            return self._url_at(loc)
+
+    def exists(self, code):
+        return self.load_view(code) is not None
+
+    def items(self):
+        """All (code, url) pairs, newest record per code."""
+        with self.index_lock:
+            locs = [loc for h, loc in zip(self.index.hashes, self.index.locs) if h]
+            return [(str(self._code_at(loc), "utf-8"), str(self._url_at(loc), "utf-8"))
+                    for loc in locs]
+
+    def __len__(self):
+        return self.index.count
+
+    def stats(self):
+        with self.cv:
+            records, commits = self.durable, self.commits
+        return {
+            "codes": self.index.count,
+            "records_written": records,
+            "commits": commits,
+            "segments": self.active,
+            "index_bytes": self.index.nbytes(),
+            "recovered_from": self.recovered_from,
+        }
+
+    def close(self, checkpoint=True):
+        with self.cv:
+            if self.closed:
+                return
+            self.closed = True
+            self.cv.notify_all()
+        self.committer.join()
+        if checkpoint:
+            self.checkpoint()
+        os.close(self.fd)
+        self.maps.clear()  # mmaps close once outstanding views are gone
+
+    # --- segments and records ---
+
+    def _segment_path(self, seg):
+        return os.path.join(self.path, f"seg-{seg:06d}.log")
+
+    def _map(self, seg, need):
+        """mmap covering at least need bytes of seg. Caller holds index_lock."""
+        m = self.maps.get(seg)
+        if m is None or len(m) < need:
+            # The active segment grew since it was mapped: map it again.
+            # The old map is dropped, not closed; views into it stay valid.
+            with open(self._segment_path(seg), "rb") as f:
+                m = self.maps[seg] = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        return m
+
+    def _code_at(self, loc):
+        seg, off = loc >> OFFSET_BITS, loc & OFFSET_MASK
+        m = self._map(seg, off + _REC.size)
+        _, clen, ulen = _REC.unpack_from(m, off)
+        m = self._map(seg, off + _REC.size + clen + ulen)
+        start = off + _REC.size
+        return memoryview(m)[start:start + clen]
+
+    def _url_at(self, loc):
+        seg, off = loc >> OFFSET_BITS, loc & OFFSET_MASK
+        m = self._map(seg, off + _REC.size)
+        _, clen, ulen = _REC.unpack_from(m, off)
+        start = off + _REC.size + clen
+        m = self._map(seg, start + ulen)
+        return memoryview(m)[start:start + ulen]
+
+    # --- group commit ---
+
+    def _commit_loop(self):
+        while True:
+            with self.cv:
+                while not self.pending and not self.closed:
+                    self.cv.wait()
+                if not self.pending:
+                    return  # closed and drained
+                batch, self.pending = self.pending, []
+                upto = self.queued
+            try:
+                self._write_batch(batch)
+            except OSError as e:
+                with self.cv:
+                    self.error = e
+                    self.cv.notify_all()
+                return
+            with self.cv:
+                self.durable = upto
+                self.commits += 1
+                self.cv.notify_all()
+
+    def _write_batch(self, batch):
+        chunks, placed = [], []
+        for cb, ub in batch:
+            rec_len = _REC.size + len(cb) + len(ub)
+            if self.size + rec_len > self.segment_bytes and self.size > 0:
+                self._flush(chunks)
+                chunks = []
+                self._roll()
+            placed.append((cb, self.active << OFFSET_BITS | self.size))
+            chunks.append(_REC.pack(zlib.crc32(ub, zlib.crc32(cb)), len(cb), len(ub)))
+            chunks.append(cb)
+            chunks.append(ub)
+            self.size += rec_len
+        self._flush(chunks)
+        with self.index_lock:
+            for cb, loc in placed:
+                self.index.put(_hash(cb), loc, lambda old: self._code_at(old) == cb)
+            self.indexed_upto = (self.active, self.size)
+
+    def _flush(self, chunks):
+        # os.write may write only part of a large buffer (e.g. the disk
+        # fills mid-batch); keep going so a full disk raises instead
+        view = memoryview(b"".join(chunks))
+        while view:
+            n = os.write(self.fd, view)
+            if n == 0:
+                raise OSError("log write made no progress")
+            view = view[n:]
+        os.fsync(self.fd)
+
+    def _roll(self):
+        os.close(self.fd)
+        self.active += 1
+        self.fd = os.open(self._segment_path(self.active),
+                          os.O_WRONLY | os.O_CREAT | os.O_APPEND, 0o644)
+        self.size = 0
+
+    # --- recovery and checkpoints ---
+
+    def _recover(self):
+        segs = sorted(int(name[4:10]) for name in os.listdir(self.path)
+                      if name.startswith("seg-") and name.endswith(".log"))
+        start = self._load_checkpoint(segs)
+        if start is None:
+            start = (segs[0], 0) if segs else (1, 0)
+            self.recovered_from = "scan" if segs else "empty"
+        for seg in segs:
+            if seg >= start[0]:
+                self._scan(seg, start[1] if seg == start[0] else 0)
+        self.active = segs[-1] if segs else 1
+        self.fd = os.open(self._segment_path(self.active),
+                          os.O_WRONLY | os.O_CREAT | os.O_APPEND, 0o644)
+        self.size = os.fstat(self.fd).st_size
+        self.indexed_upto = (self.active, self.size)
+
+    def _scan(self, seg, off):
+        """Index every record in seg from off; cut off a torn tail."""
+        path = self._segment_path(seg)
+        end = os.path.getsize(path)
+        if end == 0:
+            return
+        with self.index_lock:
+            m = self._map(seg, end)
+            while off + _REC.size <= end:
+                crc, clen, ulen = _REC.unpack_from(m, off)
+                body = off + _REC.size
+                if body + clen + ulen > end:
+                    break
+                cb = bytes(m[body:body + clen])
+                if zlib.crc32(m[body + clen:body + clen + ulen], zlib.crc32(cb)) != crc:
+                    break
+                self.index.put(_hash(cb), seg << OFFSET_BITS | off,
+                               lambda old: self._code_at(old) == cb)
+                off = body + clen + ulen
+        if off < end:
+            self.maps.pop(seg, None)
+            os.truncate(path, off)
+
+    def checkpoint(self):
+        """Write the index and the log position it covers."""
+        with self.index_lock:
+            seg, off = self.indexed_upto
+            idx = self.index
+            header = _CKPT.pack(CKPT_MAGIC, seg, off, idx.mask + 1, idx.count)
+            hashes, locs = idx.hashes.tobytes(), idx.locs.tobytes()
+        crc = zlib.crc32(locs, zlib.crc32(hashes, zlib.crc32(header)))
+        tmp = os.path.join(self.path, "index.ckpt.tmp")
+        with open(tmp, "wb") as f:
+            f.write(header)
+            f.write(hashes)
+            f.write(locs)
+            f.write(struct.pack("<I", crc))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, os.path.join(self.path, "index.ckpt"))
+
+    def _load_checkpoint(self, segs):
+        """Install a valid checkpoint; returns the (segment, offset) to scan
+        from, or None to scan everything."""
+        path = os.path.join(self.path, "index.ckpt")
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+        except FileNotFoundError:
+            return None
+        if len(data) < _CKPT.size + 4:
+            return None
+        magic, seg, off, slots, count = _CKPT.unpack_from(data)
+        body_end = _CKPT.size + 16 * slots
+        if (magic != CKPT_MAGIC or len(data) != body_end + 4
+                or struct.unpack_from("<I", data, body_end)[0] != zlib.crc32(data[:body_end])):
+            return None
+        # The log must still contain everything the checkpoint points into
+        if seg not in segs and not (seg == 1 and off == 0):
+            return None
+        if seg in segs and os.path.getsize(self._segment_path(seg)) < off:
+            return None
+        idx = _Index.__new__(_Index)
+        idx.hashes = array("Q", data[_CKPT.size:_CKPT.size + 8 * slots])
+        idx.locs = array("Q", data[_CKPT.size + 8 * slots:body_end])
+        idx.mask = slots - 1
+        idx.count = count
+        self.index = idx
+        self.recovered_from = "checkpoint"
+        return seg, off
+
+
+# --- Demo ---
+
+def main():
+    path = tempfile.mkdtemp(prefix="urllog-")
+    print(f"=== log store demo ({path}) ===\n")
+    store = LogStore(path)
+
+    def writer(w):
+        for i in range(500):
+            store.save(f"w{w}c{i}", f"https://example.com/{w}/{i}")
+
+    start = time.perf_counter()
+    threads = [threading.Thread(target=writer, args=(w,)) for w in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - start
+    st = store.stats()
+    print(f"8 writers x 500 saves in {elapsed*1000:.0f}ms: "
+          f"{st['records_written']} records, {st['commits']} fsyncs (group commit)")
+    print(f"load w3c42 -> {store.load('w3c42')}")
+    store.close()
+
+    store = LogStore(path)
+    print(f"\nreopened from {store.recovered_from}: {len(store)} codes, "
+          f"w7c499 -> {store.load('w7c499')}")
+    store.save("late", "https://example.com/after-checkpoint")
+    store.close(checkpoint=False)  # as if the process crashed
+
+    store = LogStore(path)
+    print(f"reopened from {store.recovered_from} + tail scan: {len(store)} codes, "
+          f"late -> {store.load('late')}")
+    store.close()
+
+    os.remove(os.path.join(path, "index.ckpt"))
+    store = LogStore(path)
+    print(f"reopened from {store.recovered_from}: {len(store)} codes")
+    store.close()
+    shutil.rmtree(path)
+    print("\ndemo done")
+
+
+if __name__ == "__main__":
+    main()
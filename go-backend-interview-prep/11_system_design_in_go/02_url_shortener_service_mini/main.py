@@ -1,14 +1,25 @@
 """URL shortener service -- Python equivalent."""
 
+import argparse
+import hashlib
 import json
+import os
 import random
+import signal
 import string
+import sys
 import threading
 import time
-from http.server import HTTPServer, BaseHTTPRequestHandler
+from array import array
+from collections import OrderedDict
+from http.client import HTTPConnection
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import quote
 from urllib.request import urlopen, Request
 from urllib.error import URLError
 
+from log_store import LogStore
+
 
 # --- Store ---
 
@@ -21,6 +32,14 @@ class MemoryStore:
         with self.lock:
             self.urls[code] = url
 
+    def save_many(self, pairs):
+        with self.lock:
+            self.urls.update(pairs)
+
+    def items(self):
+        with self.lock:
+            return list(self.urls.items())
+
     def load(self, code):
         with self.lock:
             return self.urls.get(code)
@@ -47,58 +66,363 @@ def generate_unique_code(store, length=6):
     return generate_code(length + 2)
 
 
+# --- ID Allocator (collision-free codes) ---
+
+ID_BITS = 40  # 2^40 ids; fits in 7 base62 chars (62^7 ~ 2^41.7)
+CODE_LEN = 7
+_MASK = (1 << ID_BITS) - 1
+# Odd multipliers are invertible mod 2^ID_BITS, as is x ^= x >> k
+_MUL1 = 0x5DEECE66D | 1
+_MUL2 = 0xB5AD4ECEDB | 1
+
+
+def encode_base62(n, width=CODE_LEN):
+    chars = []
+    for _ in range(width):
+        n, r = divmod(n, 62)
+        chars.append(CHARSET[r])
+    if n:
+        raise OverflowError("id does not fit in the code width")
+    return "".join(reversed(chars))
+
+
+def scramble(n, key=0):
+    """Bijection on [0, 2^ID_BITS): consecutive ids give unrelated-looking
+    codes. Obscures order only; it is not encryption."""
+    n = ((n ^ key) * _MUL1) & _MASK
+    n ^= n >> 19
+    n = (n * _MUL2) & _MASK
+    return n ^ (n >> 23)
+
+
+class IDAllocator:
+    """Monotonic ids, leased to threads in blocks, encoded as base62 codes.
+
+    The shared counter is advanced under the lock once per block_size ids;
+    each thread then issues ids from its own leased block with no lock and
+    no store.exists() check -- distinct ids always give distinct codes.
+    With scramble_key set, ids pass through scramble() before encoding so
+    codes are not guessable in sequence.
+
+    With state_path set, the end of every lease is persisted before the
+    ids are handed out, so a restarted process resumes past every id it
+    may have issued (a crash only leaves a gap).
+    """
+
+    def __init__(self, start=1, block_size=1024, scramble_key=None, state_path=None):
+        self.lock = threading.Lock()
+        self.next_block = start
+        self.block_size = block_size
+        self.scramble_key = scramble_key
+        self.state_path = state_path
+        self.local = threading.local()
+        if state_path and os.path.exists(state_path):
+            with open(state_path) as f:
+                self.next_block = max(start, int(f.read()))
+
+    def lease(self, n):
+        """Reserve n consecutive ids; returns them as a range."""
+        with self.lock:
+            first = self.next_block
+            if first + n > 1 << ID_BITS:
+                raise OverflowError("id space exhausted")
+            self.next_block = first + n
+            if self.state_path:
+                self._persist(self.next_block)
+        return range(first, first + n)
+
+    def _persist(self, next_block):
+        tmp = self.state_path + ".tmp"
+        with open(tmp, "w") as f:
+            f.write(str(next_block))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, self.state_path)
+
+    def next_id(self):
+        local = self.local
+        try:
+            return next(local.block)
+        except (AttributeError, StopIteration):  # no block yet, or used up
+            local.block = iter(self.lease(self.block_size))
+            return next(local.block)
+
+    def encode(self, n):
+        if self.scramble_key is not None:
+            n = scramble(n, self.scramble_key)
+        return encode_base62(n)
+
+    def next_code(self):
+        return self.encode(self.next_id())
+
+
+# --- Redirect response cache ---
+
+class ResponseCache:
+    """LRU of fully encoded redirect responses (status line, headers, body).
+
+    A hit is written to the socket as-is: no store lock, no dict, no
+    json.dumps. Codes never change their URL, so entries need no
+    invalidation; misses (404) are not cached.
+    """
+
+    def __init__(self, capacity):
+        self.lock = threading.Lock()
+        self.capacity = capacity
+        self.entries = OrderedDict()  # code -> response bytes
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, code):
+        with self.lock:
+            raw = self.entries.get(code)
+            if raw is None:
+                self.misses += 1
+                return None
+            self.entries.move_to_end(code)
+            self.hits += 1
+            return raw
+
+    def put(self, code, raw):
+        with self.lock:
+            self.entries[code] = raw
+            self.entries.move_to_end(code)
+            if len(self.entries) > self.capacity:
+                self.entries.popitem(last=False)
+
+
+def encode_redirect(code, url, mode, version="HTTP/1.1"):
+    """Full HTTP response for GET /r/{code}: a JSON body or a 302."""
+    if mode == "302":
+        # Percent-encode CR/LF, spaces and non-ASCII so a stored URL can
+        # never inject headers
+        location = quote(url, safe=":/?#[]@!$&'()*+,;=%~")
+        return (f"{version} 302 Found\r\nLocation: {location}\r\n"
+                f"Content-Length: 0\r\n\r\n").encode("ascii")
+    body = json.dumps({"code": code, "original_url": url}).encode()
+    head = (f"{version} 200 OK\r\nContent-Type: application/json\r\n"
+            f"Content-Length: {len(body)}\r\n\r\n").encode()
+    return head + body
+
+
+# --- URL dedup (reverse index) ---
+
+class DedupIndex:
+    """Reverse index URL -> code as a fixed-width open-addressing table.
+
+    A slot is a 128-bit blake2b digest of the URL (two u64 columns) plus
+    the code packed into a u64 (codes are at most 8 ASCII bytes): 24 bytes
+    per slot and no URL strings. At 128 bits a digest collision is
+    ~n^2 / 2^129, so a hit is trusted without reading the URL back.
+    """
+
+    MAX_LOAD = 0.7
+
+    def __init__(self, slots=1 << 16):
+        self.lock = threading.Lock()
+        self._alloc(slots)
+
+    def _alloc(self, slots):
+        self.hi = array("Q", bytes(8 * slots))  # 0 = empty slot
+        self.lo = array("Q", bytes(8 * slots))
+        self.codes = array("Q", bytes(8 * slots))
+        self.mask = slots - 1
+        self.count = 0
+
+    @staticmethod
+    def _digest(url):
+        d = hashlib.blake2b(url.encode(), digest_size=16).digest()
+        return int.from_bytes(d[:8], "little") or 1, int.from_bytes(d[8:], "little")
+
+    def _find(self, hi, lo):
+        """Slot holding the digest, or the empty slot where it belongs."""
+        hs, ls, mask = self.hi, self.lo, self.mask
+        i = hi & mask
+        while hs[i] and (hs[i] != hi or ls[i] != lo):
+            i = (i + 1) & mask
+        return i
+
+    def _insert(self, hi, lo, packed):
+        if self.count + 1 > self.MAX_LOAD * (self.mask + 1):
+            old = list(zip(self.hi, self.lo, self.codes))
+            self._alloc((self.mask + 1) * 2)
+            for h, l, c in old:
+                if h:
+                    self._insert(h, l, c)
+        i = self._find(hi, lo)
+        if not self.hi[i]:  # first code indexed for a URL keeps it
+            self.count += 1
+            self.hi[i], self.lo[i], self.codes[i] = hi, lo, packed
+
+    def get_many(self, urls):
+        """Indexed code per url, or None for urls not seen before."""
+        digests = [self._digest(u) for u in urls]
+        out = []
+        with self.lock:
+            for hi, lo in digests:
+                slot = self._find(hi, lo)
+                packed = self.codes[slot] if self.hi[slot] else 0
+                out.append(packed.to_bytes(8, "little").rstrip(b"\0").decode() if packed else None)
+        return out
+
+    def add_many(self, pairs):
+        """Index (code, url) pairs once they are in the store. A URL that is
+        already indexed (e.g. two requests raced to shorten it) keeps its
+        first code; the other code stays valid, it is just not reused."""
+        digests = [(code, self._digest(url)) for code, url in pairs]
+        with self.lock:
+            for code, (hi, lo) in digests:
+                self._insert(hi, lo, int.from_bytes(code.encode(), "little"))
+
+    def nbytes(self):
+        return (self.mask + 1) * 24
+
+
+# --- Batch shorten ---
+
+MAX_BATCH = 1_000_000
+STREAM_CHUNK = 1000  # response lines per write
+
+
+def parse_batch(raw, content_type):
+    """URLs from an NDJSON body or a JSON array; items are URL strings or
+    {"url": ...} objects. Returns (urls, is_ndjson). Raises ValueError on
+    malformed input."""
+    ndjson = "ndjson" in content_type or not raw.lstrip().startswith(b"[")
+    if ndjson:
+        items = [json.loads(line) for line in raw.splitlines() if line.strip()]
+    else:
+        items = json.loads(raw)
+        if not isinstance(items, list):
+            raise ValueError("expected a JSON array")
+    if len(items) > MAX_BATCH:
+        raise ValueError(f"batch larger than {MAX_BATCH}")
+    urls = []
+    for i, item in enumerate(items):
+        url = item.get("url") if isinstance(item, dict) else item
+        if not isinstance(url, str) or not url:
+            raise ValueError(f"item {i}: provide a valid url")
+        urls.append(url)
+    return urls, ndjson
+
+
+def new_codes(k):
+    return [ids.encode(n) for n in ids.lease(k)] if k else []
+
+
+def shorten_batch(urls):
+    """Codes for urls, in order. Duplicates share one code; all new codes
+    come from one leased id block and are saved in one store call. In
+    dedup mode, URLs shortened before keep their existing code."""
+    unique = list(dict.fromkeys(urls))
+    by_url = {} if dedup is None else {
+        url: code for url, code in zip(unique, dedup.get_many(unique)) if code is not None}
+    missing = [url for url in unique if url not in by_url]
+    created = list(zip(new_codes(len(missing)), missing))
+    store.save_many(created)
+    if dedup is not None:
+        dedup.add_many(created)  # only after the write: a failed save leaves no dangling code
+    by_url.update((url, code) for code, url in created)
+    return [by_url[u] for u in urls]
+
+
 # --- Handler ---
 
 store = MemoryStore()
+ids = IDAllocator(scramble_key=0x2F6A9C3E51)
+REDIRECT_MODE = "json"  # or "302"
+dedup = None  # DedupIndex when --dedup is set
+response_cache = ResponseCache(capacity=10_000)  # None disables it
 
 
 class Handler(BaseHTTPRequestHandler):
+    # Keep-alive: every response carries Content-Length (or closes the
+    # connection), so clients can reuse one connection for many requests
+    protocol_version = "HTTP/1.1"
+
+    def _send_json(self, status, data):
+        body = json.dumps(data).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
     def do_POST(self):
         if self.path == "/shorten":
             length = int(self.headers.get("Content-Length", 0))
             body = json.loads(self.rfile.read(length))
             url = body.get("url", "")
             if not url:
-                self.send_response(400)
-                self.end_headers()
-                self.wfile.write(json.dumps({"error": "provide a valid url"}).encode())
+                self._send_json(400, {"error": "provide a valid url"})
                 return
 
-            code = generate_unique_code(store)
-            store.save(code, url)
+            code = None if dedup is None else dedup.get_many([url])[0]
+            if code is None:
+                code = ids.next_code()
+                store.save(code, url)
+                if dedup is not None:
+                    dedup.add_many([(code, url)])
 
-            self.send_response(200)
-            self.send_header("Content-Type", "application/json")
-            self.end_headers()
-            self.wfile.write(json.dumps({
+            self._send_json(200, {
                 "code": code,
                 "short_url": f"http://localhost:9002/r/{code}",
-            }).encode())
+            })
+        elif self.path == "/shorten/batch":
+            self._shorten_batch()
         else:
-            self.send_response(404)
-            self.end_headers()
+            self._send_json(404, {"error": "not found"})
+
+    def _shorten_batch(self):
+        length = int(self.headers.get("Content-Length", 0))
+        content_type = self.headers.get("Content-Type", "")
+        try:
+            urls, ndjson = parse_batch(self.rfile.read(length), content_type)
+        except ValueError as e:  # includes json.JSONDecodeError
+            self._send_json(400, {"error": str(e)})
+            return
+        codes = shorten_batch(urls)
+
+        # Stream the answer in the request's format; the length is not known
+        # up front, so closing the connection ends the body
+        self.send_response(200)
+        self.send_header("Content-Type", "application/x-ndjson" if ndjson else "application/json")
+        self.send_header("Connection", "close")
+        self.end_headers()
+        self.close_connection = True
+        if not ndjson:
+            self.wfile.write(b"[")
+        for lo in range(0, len(urls), STREAM_CHUNK):
+            items = [json.dumps({"url": u, "code": c})
+                     for u, c in zip(urls[lo:lo + STREAM_CHUNK], codes[lo:lo + STREAM_CHUNK])]
+            if ndjson:
+                chunk = "\n".join(items) + "\n"
+            else:
+                chunk = ("," if lo else "") + ",".join(items)
+            self.wfile.write(chunk.encode())
+        if not ndjson:
+            self.wfile.write(b"]")
 
     def do_GET(self):
         if self.path.startswith("/r/"):
             code = self.path[3:]
+            cache = response_cache
+            raw = cache.get(code) if cache is not None else None
+            if raw is not None:
+                self.wfile.write(raw)  # hot path: pre-encoded bytes
+                return
+
             url = store.load(code)
             if url is None:
-                self.send_response(404)
-                self.send_header("Content-Type", "application/json")
-                self.end_headers()
-                self.wfile.write(json.dumps({"error": "not found"}).encode())
+                self._send_json(404, {"error": "not found"})
                 return
 
-            self.send_response(200)
-            self.send_header("Content-Type", "application/json")
-            self.end_headers()
-            self.wfile.write(json.dumps({
-                "code": code,
-                "original_url": url,
-            }).encode())
+            raw = encode_redirect(code, url, REDIRECT_MODE, self.protocol_version)
+            if cache is not None:
+                cache.put(code, raw)
+            self.wfile.write(raw)
         else:
-            self.send_response(404)
-            self.end_headers()
+            self._send_json(404, {"error": "not found"})
 
     def log_message(self, format, *args):
         pass
@@ -124,11 +448,28 @@ def run_demo():
         print(f"POST /shorten {u} -> code={result['code']}")
         codes.append(result["code"])
 
+    batch = ["https://go.dev/blog", "https://go.dev/tour", "https://go.dev/blog"]
+    req = Request("http://localhost:9002/shorten/batch",
+                  data="\n".join(json.dumps({"url": u}) for u in batch).encode(),
+                  headers={"Content-Type": "application/x-ndjson"})
+    resp = urlopen(req, timeout=2)
+    for line in resp.read().splitlines():
+        item = json.loads(line)
+        print(f"POST /shorten/batch {item['url']} -> code={item['code']}")
+
     print()
-    for code in codes:
-        resp = urlopen(f"http://localhost:9002/r/{code}", timeout=2)
-        result = json.loads(resp.read())
-        print(f"GET /r/{code} -> {result['original_url']}")
+    for _ in range(2):  # the second pass is served from the response cache
+        for code in codes:
+            conn = HTTPConnection("localhost", 9002, timeout=2)
+            conn.request("GET", f"/r/{code}")
+            resp = conn.getresponse()
+            if resp.status == 302:
+                print(f"GET /r/{code} -> 302 Location: {resp.getheader('Location')}")
+            else:
+                print(f"GET /r/{code} -> {json.loads(resp.read())['original_url']}")
+            conn.close()
+    if response_cache is not None:
+        print(f"response cache: {response_cache.hits} hits, {response_cache.misses} misses")
 
     print()
     try:
@@ -137,13 +478,42 @@ def run_demo():
         print(f"GET /r/missing -> status={e.code}")
 
     print("\ndemo done")
-    import os
-    os._exit(0)
+    server.shutdown()  # serve_forever returns; the store is closed on the way out
 
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="url shortener service")
+    parser.add_argument("--log-dir", help="keep URLs in a durable LogStore in this directory")
+    parser.add_argument("--redirect", choices=["json", "302"], default="json",
+                        help="GET /r/{code} answers with JSON or a 302 Location redirect")
+    parser.add_argument("--cache-size", type=int, default=10_000,
+                        help="hot redirect responses kept pre-encoded (0 disables)")
+    parser.add_argument("--dedup", action="store_true",
+                        help="return the existing code when a URL is shortened again")
+    parser.add_argument("--no-demo", action="store_true", help="serve without running the demo")
+    args = parser.parse_args()
+    REDIRECT_MODE = args.redirect
+    response_cache = ResponseCache(args.cache_size) if args.cache_size > 0 else None
+    if args.log_dir:
+        store = LogStore(args.log_dir)
+        ids = IDAllocator(scramble_key=ids.scramble_key,
+                          state_path=os.path.join(args.log_dir, "ids.next"))
+        print(f"log store at {args.log_dir}: {len(store)} codes ({store.recovered_from})")
+    if args.dedup:
+        dedup = DedupIndex()
+        dedup.add_many(store.items())
+        print(f"dedup index: {dedup.count} URLs, {dedup.nbytes() >> 10} KiB table")
     print("url shortener on :9002")
-    t = threading.Thread(target=run_demo, daemon=True)
-    t.start()
-    server = HTTPServer(("", 9002), Handler)
-    server.serve_forever()
+    server = ThreadingHTTPServer(("", 9002), Handler)
+    # SIGTERM unwinds like Ctrl-C, so the finally block runs either way
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+    if not args.no_demo:
+        threading.Thread(target=run_demo, daemon=True).start()
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        if args.log_dir:
+            store.close()  # flushes pending writes and writes index.ckpt
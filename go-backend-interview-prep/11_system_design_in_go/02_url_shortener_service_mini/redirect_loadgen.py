@@ -0,0 +1,119 @@
+"""Load test for GET /r/{code} -- redirects/sec with and without the
+pre-encoded response cache.
+
+Starts main.py --no-demo as a subprocess for each configuration, shortens
+--codes URLs, then runs --conns concurrent asyncio clients for --duration
+seconds. 90% of lookups go to the 100 hottest codes. Each client keeps one
+HTTP/1.1 keep-alive connection open, so the numbers measure the request
+handler rather than TCP connection setup.
+
+Run: python3 ./11_system_design_in_go/02_url_shortener_service_mini/redirect_loadgen.py
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import subprocess
+import sys
+import time
+from http.client import HTTPConnection
+
+HOST, PORT = "127.0.0.1", 9002
+HOT = 100
+
+
+def percentile(sorted_vals: list, p: float) -> float:
+    if not sorted_vals:
+        return 0.0
+    return sorted_vals[min(len(sorted_vals) - 1, int(len(sorted_vals) * p))]
+
+
+def shorten_all(n: int) -> list:
+    codes = []
+    conn = HTTPConnection(HOST, PORT, timeout=5)  # one keep-alive connection
+    for i in range(n):
+        conn.request("POST", "/shorten", json.dumps({"url": f"https://example.com/page/{i}"}),
+                     {"Content-Type": "application/json"})
+        codes.append(json.loads(conn.getresponse().read())["code"])
+    conn.close()
+    return codes
+
+
+async def client(codes, deadline, latencies, seed) -> None:
+    rng = random.Random(seed)
+    hot = codes[:HOT]
+    reader, writer = await asyncio.open_connection(HOST, PORT)
+    while time.perf_counter() < deadline:
+        code = rng.choice(hot) if rng.random() < 0.9 else rng.choice(codes)
+        start = time.perf_counter()
+        writer.write(f"GET /r/{code} HTTP/1.1\r\nHost: {HOST}\r\n\r\n".encode())
+        status = (await reader.readline()).split()[1]
+        length = 0
+        while (line := await reader.readline()) not in (b"\r\n", b""):
+            name, _, value = line.partition(b":")
+            if name.lower() == b"content-length":
+                length = int(value)
+        await reader.readexactly(length)
+        if status not in (b"200", b"302"):
+            raise RuntimeError(f"GET /r/{code} -> {status.decode()}")
+        latencies.append(time.perf_counter() - start)
+    writer.close()
+    await writer.wait_closed()
+
+
+async def run_load(codes, conns: int, duration: float) -> tuple:
+    latencies = []
+    deadline = time.perf_counter() + duration
+    start = time.perf_counter()
+    await asyncio.gather(*(client(codes, deadline, latencies, i) for i in range(conns)))
+    elapsed = time.perf_counter() - start
+    latencies.sort()
+    return len(latencies) / elapsed, percentile(latencies, 0.50), percentile(latencies, 0.99)
+
+
+def wait_for_server(timeout: float = 5.0) -> None:
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            HTTPConnection(HOST, PORT, timeout=1).connect()
+            return
+        except OSError:
+            if time.monotonic() > deadline:
+                raise
+            time.sleep(0.05)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="redirect load test")
+    parser.add_argument("--codes", type=int, default=1000, help="URLs shortened before the run")
+    parser.add_argument("--conns", type=int, default=16, help="concurrent clients")
+    parser.add_argument("--duration", type=float, default=5.0, help="seconds per configuration")
+    parser.add_argument("--redirect", choices=["json", "302"], default="302")
+    args = parser.parse_args()
+
+    here = os.path.dirname(os.path.abspath(__file__))
+    print(f"=== GET /r/{{code}}: {args.conns} clients, {args.duration:.0f}s, "
+          f"{args.redirect} responses ===\n")
+    print(f"  {'response cache':<15}  {'redirects/sec':>13}  {'p50':>9}  {'p99':>9}")
+    for label, cache_size in (("off", 0), ("on (10k LRU)", 10_000)):
+        server = subprocess.Popen(
+            [sys.executable, os.path.join(here, "main.py"), "--no-demo",
+             "--redirect", args.redirect, "--cache-size", str(cache_size)],
+            stdout=subprocess.DEVNULL,
+        )
+        try:
+            wait_for_server()
+            codes = shorten_all(args.codes)
+            rps, p50, p99 = asyncio.run(run_load(codes, args.conns, args.duration))
+        finally:
+            server.terminate()
+            server.wait()
+        print(f"  {label:<15}  {rps:>13,.0f}  {p50*1e3:>6.2f} ms  {p99*1e3:>6.2f} ms")
+    print("\nNote: ThreadingHTTPServer runs one thread per connection; under the")
+    print("GIL the handler threads share one core, so the cache saves CPU per request.")
+
+
+if __name__ == "__main__":
+    main()
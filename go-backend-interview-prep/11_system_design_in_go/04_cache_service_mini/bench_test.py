@@ -0,0 +1,198 @@
+"""Cache benchmarks -- Python equivalent of a Go bench_test.go.
+
+- Hit throughput as reader threads increase (Cache vs ShardedCache)
+- Trace replay: hit ratio and ops/sec of LRU vs W-TinyLFU
+- Batch get_many/set_many vs loops of single calls
+- Memory: bytes per entry of Cache vs SlotCache at 1M entries (tracemalloc)
+Run: python ./11_system_design_in_go/04_cache_service_mini/bench_test.py
+"""
+
+import itertools
+import random
+import threading
+import time
+import timeit
+import tracemalloc
+
+from main import Cache, LRUPolicy, ShardedCache, SlotCache, TinyLFUPolicy
+
+KEYS = 10_000
+OPS_PER_THREAD = 100_000
+
+
+def fill(cache) -> list:
+    keys = [f"key:{i}" for i in range(KEYS)]
+    for k in keys:
+        cache.set(k, k, ttl_seconds=600)
+    return keys
+
+
+def hit_throughput(cache, keys: list, threads: int) -> float:
+    """Return total cache hits per second across all threads."""
+    start_gate = threading.Barrier(threads + 1)
+
+    def reader(offset: int) -> None:
+        start_gate.wait()
+        n = len(keys)
+        for i in range(OPS_PER_THREAD):
+            cache.get(keys[(offset + i) % n])
+
+    workers = [threading.Thread(target=reader, args=(t * 997,)) for t in range(threads)]
+    for w in workers:
+        w.start()
+    start_gate.wait()
+    start = time.perf_counter()
+    for w in workers:
+        w.join()
+    elapsed = time.perf_counter() - start
+    return threads * OPS_PER_THREAD / elapsed
+
+
+def bench_hit_scaling() -> None:
+    print(f"=== Hit throughput ({KEYS} keys, {OPS_PER_THREAD} gets/thread) ===\n")
+    print(f"  {'threads':>7}  {'Cache':>14}  {'ShardedCache':>14}")
+    # 2x headroom: shards fill unevenly, and this bench measures hits only
+    single = Cache(capacity=2 * KEYS, cleanup=False)
+    sharded = ShardedCache(capacity=2 * KEYS, shards=16)
+    single_keys = fill(single)
+    sharded_keys = fill(sharded)
+    for threads in (1, 2, 4, 8, 16):
+        a = hit_throughput(single, single_keys, threads)
+        b = hit_throughput(sharded, sharded_keys, threads)
+        print(f"  {threads:>7}  {a:>10,.0f} op/s  {b:>10,.0f} op/s")
+    print()
+    print("Note: under the GIL both plateau; sharding removes lock convoys,")
+    print("which matters most on free-threaded builds or with I/O between gets.")
+
+
+# --- Trace replay ---
+
+TRACE_LEN = 200_000
+UNIVERSE = 50_000  # distinct hot-set keys
+CACHE_SIZE = 1_000
+
+
+def zipf_trace(n: int, universe: int, s: float = 0.99, seed: int = 1) -> list:
+    rng = random.Random(seed)
+    weights = [1 / (rank ** s) for rank in range(1, universe + 1)]
+    cum = list(itertools.accumulate(weights))
+    return rng.choices(range(universe), cum_weights=cum, k=n)
+
+
+def scan_trace(n: int, universe: int, seed: int = 2) -> list:
+    """Zipf traffic interrupted by long one-off scans of cold keys."""
+    zipf = zipf_trace(n, universe, seed=seed)
+    out = []
+    cold = itertools.count(universe)
+    for i in range(0, n, 10_000):
+        out.extend(zipf[i:i + 7_000])
+        out.extend(next(cold) for _ in range(3_000))  # never requested again
+    return out
+
+
+def replay(policy, trace: list) -> tuple:
+    """Cache-aside replay: get, and set on miss. Returns (hit_ratio, ops/sec)."""
+    cache = Cache(CACHE_SIZE, cleanup=False, policy=policy)
+    hits = 0
+    start = time.perf_counter()
+    for key in trace:
+        _, ok = cache.get(key)
+        if ok:
+            hits += 1
+        else:
+            cache.set(key, key, ttl_seconds=3600)
+    elapsed = time.perf_counter() - start
+    return hits / len(trace), len(trace) / elapsed
+
+
+def bench_policies() -> None:
+    print(f"=== Trace replay (cache={CACHE_SIZE}, {TRACE_LEN} requests) ===\n")
+    traces = {
+        "zipf(0.99)": zipf_trace(TRACE_LEN, UNIVERSE),
+        "zipf + scans": scan_trace(TRACE_LEN, UNIVERSE),
+    }
+    print(f"  {'workload':<14}  {'policy':<10}  {'hit ratio':>9}  {'ops/sec':>12}")
+    for name, trace in traces.items():
+        for policy in (LRUPolicy, TinyLFUPolicy):
+            ratio, ops = replay(policy, trace)
+            print(f"  {name:<14}  {policy.name:<10}  {ratio:>9.3f}  {ops:>12,.0f}")
+
+
+# --- Batch vs single ---
+
+PAGE_SIZES = (1, 20, 50)
+
+
+def bench_batch() -> None:
+    print("=== Batch vs single calls (per page render) ===\n")
+    print(f"  {'cache':<13}  {'keys':>4}  {'op':<4}  {'loop':>10}  {'batch':>10}")
+    for name, cache in (("Cache", Cache(capacity=20_000, cleanup=False)),
+                        ("ShardedCache", ShardedCache(capacity=20_000, shards=16))):
+        keys = fill(cache)
+        for size in PAGE_SIZES:
+            page = keys[:size]
+            pairs = [(k, k) for k in page]
+            runs = 200_000 // size
+
+            def get_loop():
+                for k in page:
+                    cache.get(k)
+
+            def set_loop():
+                for k, v in pairs:
+                    cache.set(k, v, 600)
+
+            loop_get = timeit.timeit(get_loop, number=runs) / runs
+            batch_get = timeit.timeit(lambda: cache.get_many(page), number=runs) / runs
+            loop_set = timeit.timeit(set_loop, number=runs) / runs
+            batch_set = timeit.timeit(lambda: cache.set_many(pairs, 600), number=runs) / runs
+            print(f"  {name:<13}  {size:>4}  get   {loop_get*1e6:>7.1f} us  {batch_get*1e6:>7.1f} us")
+            print(f"  {name:<13}  {size:>4}  set   {loop_set*1e6:>7.1f} us  {batch_set*1e6:>7.1f} us")
+
+
+# --- Memory per entry ---
+
+MEM_ENTRIES = 1_000_000
+
+
+def bytes_per_entry(make_cache, keys: list, values: list) -> float:
+    """Bytes allocated by the cache structure itself, per entry.
+
+    Keys and values are created before tracing starts, so only the
+    container overhead (dicts, entry objects, arrays, heap tuples) counts.
+    """
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    cache = make_cache()
+    for k, v in zip(keys, values):
+        cache.set(k, v, 600)
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    assert cache.size() == len(keys)
+    return (after - before) / len(keys)
+
+
+def bench_memory() -> None:
+    print(f"=== Memory per entry ({MEM_ENTRIES:,} entries, tracemalloc) ===\n")
+    keys = [f"key:{i}" for i in range(MEM_ENTRIES)]
+    values = [i for i in range(MEM_ENTRIES)]
+    layouts = (
+        ("Cache (dict + entry + heap)", lambda: Cache(MEM_ENTRIES, cleanup=False)),
+        ("SlotCache (arrays)", lambda: SlotCache(MEM_ENTRIES)),
+    )
+    for name, make in layouts:
+        print(f"  {name:<28}  {bytes_per_entry(make, keys, values):>6.0f} B/entry")
+
+
+def main() -> None:
+    bench_hit_scaling()
+    print()
+    bench_policies()
+    print()
+    bench_batch()
+    print()
+    bench_memory()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,78 +1,972 @@
 """Cache service with TTL and LRU eviction -- Python equivalent."""
 
+import heapq
+import itertools
+import json
+import mmap
+import os
+import pickle
+import struct
+import sys
+import tempfile
 import threading
 import time
+from array import array
 from collections import OrderedDict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.request import urlopen
+
+SWEEP_BATCH = 256  # max deadlines popped per lock hold during cleanup
+COMPACT_MIN = 1024  # deadline heap is never compacted below this size
+RESTORE_BATCH = 1024  # max entries inserted per lock hold during restore
 
 
 class CacheEntry:
-    def __init__(self, value, expires_at):
+    def __init__(self, value, expires_at, stale_until=None, weight=0):
         self.value = value
         self.expires_at = expires_at
+        # get_or_load may serve the value until stale_until while refreshing
+        self.stale_until = expires_at if stale_until is None else stale_until
+        self.weight = weight  # bytes charged against max_bytes
 
 
-class Cache:
+class LatencyHistogram:
+    """Durations counted in power-of-two nanosecond buckets.
+
+    Bucket i holds durations in [2**(i-1), 2**i) ns, so recording is one
+    bit_length() and one list increment. Callers serialize record().
+    """
+
+    def __init__(self):
+        self.counts = [0] * 64
+
+    def record(self, ns):
+        self.counts[ns.bit_length()] += 1
+
+    def summary(self, counts=None):
+        """Count and bucket upper bounds (in us) for p50/p90/p99/max."""
+        counts = list(self.counts) if counts is None else counts
+        total = sum(counts)
+        out = {"count": total}
+        for name, q in (("p50_us", 0.50), ("p90_us", 0.90), ("p99_us", 0.99), ("max_us", 1.0)):
+            target, seen = q * total, 0
+            for i, c in enumerate(counts):
+                seen += c
+                if c and seen >= target:
+                    out[name] = (1 << i) / 1000
+                    break
+            else:
+                out[name] = 0.0
+        return out
+
+
+def sizeof_weigher(key, value):
+    """Default weigher: shallow sys.getsizeof of key and value."""
+    return sys.getsizeof(key) + sys.getsizeof(value)
+
+
+class _Call:
+    """One in-flight loader call that concurrent callers wait on."""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.value = None
+        self.error = None
+
+
+# --- Eviction Policies ---
+#
+# A policy tracks key order and picks eviction victims; Cache owns the
+# entries. Cache calls the record_* hooks under its lock, and victim() once
+# per entry over capacity. A policy is built with policy(capacity).
+
+class LRUPolicy:
+    name = "LRU"
+
+    def __init__(self, capacity):
+        self.order = OrderedDict()  # key -> None, least recent first
+
+    def record_insert(self, key):
+        self.order[key] = None
+
+    def record_access(self, key):
+        self.order.move_to_end(key)
+
+    def record_remove(self, key):
+        del self.order[key]
+
+    def victim(self):
+        key, _ = self.order.popitem(last=False)  # pop from front (oldest)
+        return key
+
+    def ordered_keys(self):
+        """Keys from coldest to hottest."""
+        return list(self.order)
+
+
+# Halve every 8-bit counter in one C-level pass (used for sketch aging)
+_HALVE = bytes(i >> 1 for i in range(256))
+
+
+class CountMinSketch:
+    """Approximate per-key access counts in a fixed bytearray.
+
+    Counters saturate at 15; after sample_size increments all counters are
+    halved so old popularity fades (the "aging" step of TinyLFU).
+    """
+
+    DEPTH = 4
+    MAX_COUNT = 15
+
+    def __init__(self, capacity):
+        width = 1
+        while width < max(capacity, 16):
+            width <<= 1
+        self.mask = width - 1
+        self.width = width
+        self.table = bytearray(width * self.DEPTH)
+        self.sample_size = 10 * max(capacity, 16)
+        self.additions = 0
+
+    def _indexes(self, key):
+        # Double hashing: row i uses slot (h1 + i*h2) from one 64-bit mix
+        h = ((hash(key) & 0xFFFFFFFFFFFFFFFF) * 0x9E3779B97F4A7C15) & 0xFFFFFFFFFFFFFFFF
+        h1, h2 = h & self.mask, ((h >> 32) | 1) & self.mask
+        w, m = self.width, self.mask
+        return (h1, w + ((h1 + h2) & m), 2 * w + ((h1 + 2 * h2) & m), 3 * w + ((h1 + 3 * h2) & m))
+
+    def increment(self, key):
+        table = self.table
+        for i in self._indexes(key):
+            if table[i] < self.MAX_COUNT:
+                table[i] += 1
+        self.additions += 1
+        if self.additions >= self.sample_size:
+            self.table = bytearray(table.translate(_HALVE))
+            self.additions //= 2
+
+    def estimate(self, key):
+        table = self.table
+        a, b, c, d = self._indexes(key)
+        return min(table[a], table[b], table[c], table[d])
+
+
+class TinyLFUPolicy:
+    """W-TinyLFU: small LRU admission window + frequency-gated segmented LRU.
+
+    New keys enter the window (1% of capacity). A key leaving the window
+    only displaces the main space's LRU victim if the sketch says it is
+    accessed more often, so a one-off scan cannot flush the hot set. The
+    main space is a segmented LRU: probation (20%) and protected (80%).
+    """
+
+    name = "W-TinyLFU"
+
     def __init__(self, capacity):
+        self.window_max = max(1, capacity // 100)
+        self.main_max = max(1, capacity - self.window_max)
+        self.protected_max = max(1, self.main_max * 8 // 10)
+        self.window = OrderedDict()
+        self.probation = OrderedDict()
+        self.protected = OrderedDict()
+        self.sketch = CountMinSketch(capacity)
+
+    def record_insert(self, key):
+        self.sketch.increment(key)
+        self.window[key] = None
+        # While main space has room, window overflow moves in uncontested
+        if (len(self.window) > self.window_max
+                and len(self.probation) + len(self.protected) < self.main_max):
+            moved, _ = self.window.popitem(last=False)
+            self.probation[moved] = None
+
+    def record_access(self, key):
+        self.sketch.increment(key)
+        if key in self.window:
+            self.window.move_to_end(key)
+        elif key in self.probation:
+            del self.probation[key]
+            self.protected[key] = None
+            if len(self.protected) > self.protected_max:
+                demoted, _ = self.protected.popitem(last=False)
+                self.probation[demoted] = None
+        else:
+            self.protected.move_to_end(key)
+
+    def record_remove(self, key):
+        for segment in (self.window, self.probation, self.protected):
+            if key in segment:
+                del segment[key]
+                return
+
+    def ordered_keys(self):
+        return list(self.probation) + list(self.protected) + list(self.window)
+
+    def _main_victim(self):
+        segment = self.probation or self.protected
+        key, _ = segment.popitem(last=False)
+        return key
+
+    def victim(self):
+        if not (self.probation or self.protected):
+            key, _ = self.window.popitem(last=False)
+            return key
+        if len(self.window) <= self.window_max:
+            return self._main_victim()
+
+        # Admission contest: window's LRU candidate vs main space's LRU victim
+        candidate, _ = self.window.popitem(last=False)
+        segment = self.probation or self.protected
+        incumbent = next(iter(segment))
+        if self.sketch.estimate(candidate) > self.sketch.estimate(incumbent):
+            del segment[incumbent]
+            self.probation[candidate] = None
+            return incumbent
+        return candidate
+
+
+# --- Cache ---
+
+class Cache:
+    def __init__(self, capacity, cleanup=True, policy=LRUPolicy, on_event=None,
+                 max_bytes=None, weigher=None):
         self.lock = threading.Lock()
-        self.items = OrderedDict()  # key -> CacheEntry (OrderedDict tracks access order)
+        self.items = {}  # key -> CacheEntry
         self.capacity = capacity
+        self.policy = policy(capacity)  # tracks access order, picks victims
 
-        # Start periodic cleanup
-        t = threading.Thread(target=self._cleanup_loop, daemon=True)
-        t.start()
+        # on_event(event, key, reason) for "evict"/"expire"; events are queued
+        # under the lock and delivered after it is released
+        self.on_event = on_event
+        self.events = []
 
-    def set(self, key, value, ttl_seconds):
+        # Byte budget: weigher(key, value) -> bytes, summed incrementally
+        self.max_bytes = max_bytes
+        if weigher is None and max_bytes is not None:
+            weigher = sizeof_weigher
+        self.weigher = weigher
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.overwrites = 0
+        self.get_latency = LatencyHistogram()
+        self.set_latency = LatencyHistogram()
+        # Min-heap of (expires_at, seq, key). Entries go stale when a key is
+        # overwritten or evicted; the sweep skips them when they come due, and
+        # compacts the heap in batches once stale ones dominate.
+        self.deadlines = []
+        self.seq = itertools.count()  # tie-breaker so keys are never compared
+
+        # Singleflight: key -> _Call for loads in progress
+        self.inflight = {}
+        self.loads = 0
+        self.load_errors = 0
+        self.load_seconds_total = 0.0
+        self.load_seconds_max = 0.0
+        self.coalesced_waiters = 0
+        self.stale_served = 0
+
+        # Start periodic cleanup (ShardedCache runs one loop for all shards)
+        if cleanup:
+            t = threading.Thread(target=self._cleanup_loop, daemon=True)
+            t.start()
+
+    def set(self, key, value, ttl_seconds, stale_seconds=0):
+        start = time.perf_counter_ns()
+        weight = self.weigher(key, value) if self.weigher else 0
         with self.lock:
-            if key in self.items:
-                # Update existing: remove and re-insert at end (most recent)
-                del self.items[key]
+            if self.max_bytes is not None and weight > self.max_bytes:
+                # Can never fit; drop the old value rather than keep serving it
+                if key in self.items:
+                    self._remove(key)
+            else:
+                expires_at = time.time() + ttl_seconds
+                self._put(key, value, weight, expires_at, expires_at + stale_seconds)
+            self.set_latency.record(time.perf_counter_ns() - start)
+        if self.events:
+            self._emit_events()
 
-            if len(self.items) >= self.capacity:
-                self._evict_lru()
+    def _put(self, key, value, weight, expires_at, stale_until):
+        """Insert or replace an entry, then evict to fit. Caller must hold lock."""
+        old = self.items.get(key)
+        self.items[key] = CacheEntry(value, expires_at, stale_until, weight)
+        self.bytes += weight - (old.weight if old is not None else 0)
+        self._push_deadline(key, stale_until)
 
-            self.items[key] = CacheEntry(value, time.time() + ttl_seconds)
+        if old is not None:
+            # Update existing: counts as a use (most recent)
+            self.overwrites += 1
+            self.policy.record_access(key)
+        else:
+            self.policy.record_insert(key)
+        while len(self.items) > self.capacity or (
+                self.max_bytes is not None and self.bytes > self.max_bytes):
+            self._evict()
 
     def get(self, key):
+        start = time.perf_counter_ns()
+        with self.lock:
+            result = self._lookup(key, time.time())
+            self.get_latency.record(time.perf_counter_ns() - start)
+        if self.events:
+            self._emit_events()
+        return result
+
+    def _lookup(self, key, now):
+        """Return (value, found) and record the access. Caller must hold lock."""
+        entry = self.items.get(key)
+        if entry is None:
+            self.misses += 1
+            return None, False
+
+        # Lazy expiration (entries inside a stale window stay for get_or_load)
+        if now > entry.expires_at:
+            if now > entry.stale_until:
+                self._expire(key)
+            self.misses += 1
+            return None, False
+
+        self.hits += 1
+        self.policy.record_access(key)
+        return entry.value, True
+
+    def delete(self, key):
         with self.lock:
             if key not in self.items:
-                return None, False
+                return False
+            self._remove(key)
+            return True
 
-            entry = self.items[key]
+    def touch(self, key, ttl_seconds):
+        """Reset a live key's TTL without rewriting its value."""
+        with self.lock:
+            entry = self.items.get(key)
+            now = time.time()
+            if entry is None or now > entry.expires_at:
+                return False
+            expires_at = now + ttl_seconds
+            stale_until = expires_at + (entry.stale_until - entry.expires_at)
+            # Replace rather than mutate: snapshot views may hold the old entry
+            self.items[key] = CacheEntry(entry.value, expires_at, stale_until, entry.weight)
+            self._push_deadline(key, stale_until)
+            self.policy.record_access(key)
+            return True
 
-            # Lazy expiration
-            if time.time() > entry.expires_at:
-                del self.items[key]
-                return None, False
+    # --- Batch operations: one lock hold and one clock read per call ---
+
+    def get_many(self, keys, now=None):
+        """Return [(value, found), ...] in the same order as keys.
+
+        The whole batch is one get_latency sample."""
+        keys = list(keys)
+        start = time.perf_counter_ns()
+        with self.lock:
+            if now is None:
+                now = time.time()
+            lookup = self._lookup
+            results = [lookup(k, now) for k in keys]
+            self.get_latency.record(time.perf_counter_ns() - start)
+        if self.events:
+            self._emit_events()
+        return results
 
-            # Move to end (most recently used)
-            self.items.move_to_end(key)
-            return entry.value, True
+    def set_many(self, items, ttl_seconds, stale_seconds=0, now=None):
+        """Store (key, value) pairs (or a dict) with one shared TTL."""
+        pairs = list(items.items() if hasattr(items, "items") else items)
+        weigher = self.weigher
+        weights = [weigher(k, v) if weigher else 0 for k, v in pairs]
+        with self.lock:
+            if now is None:
+                now = time.time()
+            expires_at = now + ttl_seconds
+            stale_until = expires_at + stale_seconds
+            for (key, value), weight in zip(pairs, weights):
+                if self.max_bytes is not None and weight > self.max_bytes:
+                    if key in self.items:
+                        self._remove(key)
+                    continue
+                self._put(key, value, weight, expires_at, stale_until)
+        if self.events:
+            self._emit_events()
+
+    def delete_many(self, keys):
+        """Return [deleted, ...] in the same order as keys."""
+        keys = list(keys)
+        out = []
+        with self.lock:
+            for key in keys:
+                found = key in self.items
+                if found:
+                    self._remove(key)
+                out.append(found)
+        return out
+
+    def get_or_load(self, key, loader, ttl_seconds, stale_seconds=0):
+        """Return the cached value, calling loader(key) at most once per miss.
+
+        Concurrent misses for the same key wait for the first caller's load
+        instead of all hitting the backend. With stale_seconds > 0 an expired
+        value is served for that long while one background refresh runs.
+        Loader errors are raised to the caller and every waiter.
+        """
+        with self.lock:
+            entry = self.items.get(key)
+            now = time.time()
+            if entry is not None and now <= entry.stale_until:
+                self.hits += 1
+                self.policy.record_access(key)
+                if now <= entry.expires_at:
+                    return entry.value
+                # Stale: serve it and make sure exactly one refresh runs
+                self.stale_served += 1
+                refresh = None
+                if key not in self.inflight:
+                    refresh = self.inflight[key] = _Call()
+                stale_value = entry.value
+            else:
+                self.misses += 1
+                call = self.inflight.get(key)
+                leader = call is None
+                if leader:
+                    call = self.inflight[key] = _Call()
+                else:
+                    self.coalesced_waiters += 1
+
+        if entry is not None and now <= entry.stale_until:
+            if refresh is not None:
+                t = threading.Thread(
+                    target=self._load,
+                    args=(key, loader, ttl_seconds, stale_seconds, refresh),
+                    daemon=True,
+                )
+                t.start()
+            return stale_value
+
+        if leader:
+            self._load(key, loader, ttl_seconds, stale_seconds, call)
+        else:
+            call.done.wait()
+        if call.error is not None:
+            raise call.error
+        return call.value
+
+    def _load(self, key, loader, ttl_seconds, stale_seconds, call):
+        start = time.perf_counter()
+        try:
+            call.value = loader(key)
+        except Exception as e:
+            call.error = e
+        else:
+            self.set(key, call.value, ttl_seconds, stale_seconds)
+        elapsed = time.perf_counter() - start
+        with self.lock:
+            self.loads += 1
+            if call.error is not None:
+                self.load_errors += 1
+            self.load_seconds_total += elapsed
+            self.load_seconds_max = max(self.load_seconds_max, elapsed)
+            del self.inflight[key]
+        call.done.set()
+
+    def load_stats(self):
+        with self.lock:
+            return {
+                "loads": self.loads,
+                "load_errors": self.load_errors,
+                "load_seconds_total": self.load_seconds_total,
+                "load_seconds_max": self.load_seconds_max,
+                "coalesced_waiters": self.coalesced_waiters,
+                "stale_served": self.stale_served,
+            }
+
+    def stats(self):
+        """Point-in-time counters, read without taking the cache lock.
+
+        Each field is a single int read (atomic under the GIL), so stats()
+        never makes a writer wait; fields may be a few operations apart.
+        """
+        hits, misses = self.hits, self.misses
+        lookups = hits + misses
+        return {
+            "entries": len(self.items),
+            "capacity": self.capacity,
+            "resident_bytes": self.bytes,
+            "max_bytes": self.max_bytes,
+            "hits": hits,
+            "misses": misses,
+            "hit_ratio": hits / lookups if lookups else 0.0,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "overwrites": self.overwrites,
+            "get_latency": self.get_latency.summary(),
+            "set_latency": self.set_latency.summary(),
+        }
 
     def size(self):
         with self.lock:
             return len(self.items)
 
-    def _evict_lru(self):
-        """Remove least recently used entry. Caller must hold lock."""
-        if self.items:
-            key, _ = self.items.popitem(last=False)  # pop from front (oldest)
-            print(f"  [evict] key={key!r} (LRU)")
+    def snapshot(self, path):
+        """Write all entries, coldest first, to path. Returns entries written."""
+        return write_snapshot(path, [self._snapshot_view()])
+
+    def restore(self, path):
+        """Load a snapshot, skipping expired entries. Returns entries loaded."""
+        return self._restore_records(read_snapshot(path))
+
+    def _snapshot_view(self):
+        # Two C-level copies under the lock; pickling and disk I/O happen
+        # after release, so readers are only paused for the copy.
+        with self.lock:
+            return self.policy.ordered_keys(), self.items.copy()
+
+    def _restore_records(self, records):
+        loaded = 0
+        records = iter(records)
+        while True:
+            batch = list(itertools.islice(records, RESTORE_BATCH))
+            if not batch:
+                return loaded
+            weigher = self.weigher
+            with self.lock:
+                for key, value, expires_at, stale_until in batch:
+                    weight = weigher(key, value) if weigher else 0
+                    if self.max_bytes is not None and weight > self.max_bytes:
+                        continue
+                    self._put(key, value, weight, expires_at, stale_until)
+                    loaded += 1
+            if self.events:
+                self._emit_events()
+
+    def _push_deadline(self, key, stale_until):
+        """Schedule key for the sweep. Caller must hold lock."""
+        heapq.heappush(self.deadlines, (stale_until, next(self.seq), key))
+
+    def _remove(self, key):
+        """Drop key and its byte charge. Caller must hold lock."""
+        entry = self.items.pop(key)
+        self.bytes -= entry.weight
+        self.policy.record_remove(key)
+
+    def _expire(self, key):
+        """Remove an entry whose TTL (and stale window) passed. Caller must hold lock."""
+        self._remove(key)
+        self.expirations += 1
+        if self.on_event is not None:
+            self.events.append(("expire", key, "ttl"))
+
+    def _evict(self):
+        """Remove the policy's victim. Caller must hold lock."""
+        key = self.policy.victim()
+        self.bytes -= self.items.pop(key).weight
+        self.evictions += 1
+        if self.on_event is not None:
+            self.events.append(("evict", key, self.policy.name))
+
+    def _emit_events(self):
+        """Deliver queued events to on_event. Caller must NOT hold lock."""
+        with self.lock:
+            events, self.events = self.events, []
+        for event, key, reason in events:
+            self.on_event(event, key, reason)
 
     def _cleanup_loop(self):
         while True:
             time.sleep(1)
+            self._sweep()
+
+    def _sweep(self):
+        """Expire due entries, touching only the heap head, then compact
+        the heap if stale deadlines dominate it.
+
+        Work per lock hold is capped at SWEEP_BATCH deadlines, so readers
+        wait at most one batch no matter how large the cache is.
+        """
+        now = time.time()
+        done = False
+        while not done:
             with self.lock:
-                now = time.time()
-                expired = [k for k, e in self.items.items() if now > e.expires_at]
-                for k in expired:
-                    print(f"  [cleanup] expired key={k!r}")
-                    del self.items[k]
+                for _ in range(SWEEP_BATCH):
+                    if not self.deadlines or self.deadlines[0][0] >= now:
+                        done = True
+                        break
+                    _, _, key = heapq.heappop(self.deadlines)
+                    entry = self.items.get(key)
+                    # Stale deadline: key was evicted or re-set with a later expiry
+                    if entry is not None and now > entry.stale_until:
+                        self._expire(key)
+            if self.events:
+                self._emit_events()
+        with self.lock:
+            bloated = len(self.deadlines) > max(COMPACT_MIN, 2 * len(self.items))
+        if bloated:
+            self._compact()
+
+    def _compact(self):
+        """Drop deadlines left behind by overwrites, touches and evictions.
+
+        Without this they only pop once due -- never, for the 10-year TTL
+        memcached exptime 0 maps to. The heap is detached (writers push to
+        a fresh one), filtered against self.items SWEEP_BATCH entries per
+        lock hold into a new heap built outside the lock, and the writes
+        that arrived meanwhile are merged back in batches. Only the sweep calls this, so
+        nothing else pops the heap while it is detached.
+        """
+        with self.lock:
+            old, self.deadlines = self.deadlines, []
+        kept = []
+        for i in range(0, len(old), SWEEP_BATCH):
+            with self.lock:
+                items = self.items
+                live = [d for d in old[i:i + SWEEP_BATCH]
+                        if (e := items.get(d[2])) is not None and e.stale_until == d[0]]
+            for d in live:  # private heap: no lock, and no O(n) heapify holding the GIL
+                heapq.heappush(kept, d)
+        while True:
+            with self.lock:
+                fresh = self.deadlines
+                for _ in range(min(SWEEP_BATCH, len(fresh))):
+                    heapq.heappush(kept, fresh.pop())
+                if not fresh:
+                    self.deadlines = kept
+                    return
+
+
+# --- Slot Cache ---
+
+NIL = -1
+
+
+class SlotCache:
+    """LRU + TTL cache with compact, preallocated per-entry storage.
+
+    Instead of a CacheEntry object and an OrderedDict node per key, entry i
+    lives in slot i of parallel buffers: expires_at in array('d'), prev/next
+    LRU links in array('l') (an intrusive doubly-linked list), and key/value
+    references in two lists. The only per-key dict is key -> slot index.
+    Expired entries are removed lazily on get or when they reach the LRU tail.
+    """
+
+    def __init__(self, capacity):
+        self.lock = threading.Lock()
+        self.capacity = capacity
+        self.index = {}  # key -> slot
+        self.keys = [None] * capacity
+        self.values = [None] * capacity
+        self.expires = array("d", bytes(8 * capacity))
+        self.prev = array("l", [NIL]) * capacity
+        self.next = array("l", [NIL]) * capacity
+        self.head = NIL  # most recently used
+        self.tail = NIL  # least recently used
+        self.free = array("l")  # slots released by delete/expiry
+        self.used = 0  # slots handed out so far (never-used slots follow)
+
+    # --- intrusive list (caller holds lock) ---
+
+    def _unlink(self, slot):
+        p, n = self.prev[slot], self.next[slot]
+        if p != NIL:
+            self.next[p] = n
+        else:
+            self.head = n
+        if n != NIL:
+            self.prev[n] = p
+        else:
+            self.tail = p
+
+    def _push_front(self, slot):
+        self.prev[slot] = NIL
+        self.next[slot] = self.head
+        if self.head != NIL:
+            self.prev[self.head] = slot
+        self.head = slot
+        if self.tail == NIL:
+            self.tail = slot
+
+    def _release(self, slot):
+        self._unlink(slot)
+        del self.index[self.keys[slot]]
+        self.keys[slot] = self.values[slot] = None
+        self.free.append(slot)
+
+    def _alloc(self):
+        if self.free:
+            return self.free.pop()
+        if self.used < self.capacity:
+            self.used += 1
+            return self.used - 1
+        victim = self.tail  # full: reuse the LRU slot
+        self._release(victim)
+        return self.free.pop()
+
+    # --- public API (same shape as Cache) ---
+
+    def set(self, key, value, ttl_seconds):
+        with self.lock:
+            slot = self.index.get(key)
+            if slot is None:
+                if self.capacity < 1:
+                    return  # nothing fits, as with Cache(0)
+                slot = self._alloc()
+                self.index[key] = slot
+                self.keys[slot] = key
+            else:
+                self._unlink(slot)
+            self.values[slot] = value
+            self.expires[slot] = time.time() + ttl_seconds
+            self._push_front(slot)
+
+    def get(self, key):
+        with self.lock:
+            slot = self.index.get(key)
+            if slot is None:
+                return None, False
+            if time.time() > self.expires[slot]:
+                self._release(slot)
+                return None, False
+            if slot != self.head:
+                self._unlink(slot)
+                self._push_front(slot)
+            return self.values[slot], True
+
+    def delete(self, key):
+        with self.lock:
+            slot = self.index.get(key)
+            if slot is None:
+                return False
+            self._release(slot)
+            return True
+
+    def size(self):
+        with self.lock:
+            return len(self.index)
+
+
+# --- Snapshots ---
+#
+# File layout: MAGIC, then one record per entry in LRU order (coldest first):
+#   <expires_at f64><stale_until f64><key_len u32><value_len u32><key><value>
+# Times are absolute wall-clock seconds; key and value are pickled.
+
+SNAPSHOT_MAGIC = b"GBCACHE1"
+_RECORD = struct.Struct("<ddII")
+
+
+def write_snapshot(path, views):
+    """Write (ordered_keys, items) views to path atomically."""
+    written = 0
+    now = time.time()
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as f:
+        f.write(SNAPSHOT_MAGIC)
+        for order, items in views:
+            for key in order:
+                entry = items.get(key)
+                if entry is None or now > entry.stale_until:
+                    continue
+                k = pickle.dumps(key, pickle.HIGHEST_PROTOCOL)
+                v = pickle.dumps(entry.value, pickle.HIGHEST_PROTOCOL)
+                f.write(_RECORD.pack(entry.expires_at, entry.stale_until, len(k), len(v)))
+                f.write(k)
+                f.write(v)
+                written += 1
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)  # readers never see a half-written snapshot
+    return written
+
+
+def read_snapshot(path):
+    """Yield (key, value, expires_at, stale_until) for live entries.
+
+    The file is mmap'd and walked record by record; expired entries are
+    skipped from the fixed header alone, without unpickling anything.
+    """
+    now = time.time()
+    with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        if mm[:len(SNAPSHOT_MAGIC)] != SNAPSHOT_MAGIC:
+            raise ValueError(f"{path}: not a cache snapshot")
+        view = memoryview(mm)
+        try:
+            off = len(SNAPSHOT_MAGIC)
+            while off < len(mm):
+                expires_at, stale_until, klen, vlen = _RECORD.unpack_from(mm, off)
+                off += _RECORD.size
+                if now <= stale_until:
+                    key = pickle.loads(view[off:off + klen])
+                    value = pickle.loads(view[off + klen:off + klen + vlen])
+                    yield key, value, expires_at, stale_until
+                off += klen + vlen
+        finally:
+            view.release()
+
+
+# --- Sharded Cache ---
+
+class ShardedCache:
+    """Lock-striped cache: keys hash across N independent Cache shards.
+
+    Each shard has its own lock, LRU order and TTL bookkeeping, so threads
+    touching different keys rarely wait on each other. Total capacity is
+    split across shards; eviction is LRU per shard (approximate globally).
+    """
+
+    def __init__(self, capacity, shards=16, policy=LRUPolicy, on_event=None,
+                 max_bytes=None, weigher=None):
+        shards = max(1, min(shards, capacity))
+        base, extra = divmod(capacity, shards)
+        shard_bytes = None if max_bytes is None else max_bytes // shards
+        self.shards = [Cache(base + (1 if i < extra else 0), cleanup=False,
+                             policy=policy, on_event=on_event,
+                             max_bytes=shard_bytes, weigher=weigher)
+                       for i in range(shards)]
+        self.capacity = capacity
+        self.max_bytes = max_bytes
+
+        # One cleanup thread for all shards instead of one per shard
+        t = threading.Thread(target=self._cleanup_loop, daemon=True)
+        t.start()
+
+    def _shard(self, key):
+        return self.shards[hash(key) % len(self.shards)]
+
+    def set(self, key, value, ttl_seconds, stale_seconds=0):
+        self._shard(key).set(key, value, ttl_seconds, stale_seconds)
+
+    def get(self, key):
+        return self._shard(key).get(key)
+
+    def get_or_load(self, key, loader, ttl_seconds, stale_seconds=0):
+        return self._shard(key).get_or_load(key, loader, ttl_seconds, stale_seconds)
+
+    def delete(self, key):
+        return self._shard(key).delete(key)
+
+    def touch(self, key, ttl_seconds):
+        return self._shard(key).touch(key, ttl_seconds)
+
+    def _group(self, keys):
+        """Return [(shard, positions of keys that hash to it)] for non-empty shards."""
+        n = len(self.shards)
+        groups = [[] for _ in range(n)]
+        for pos, key in enumerate(keys):
+            groups[hash(key) % n].append(pos)
+        return [(self.shards[i], g) for i, g in enumerate(groups) if g]
+
+    def get_many(self, keys):
+        keys = list(keys)
+        out = [None] * len(keys)
+        now = time.time()
+        for shard, positions in self._group(keys):
+            for p, r in zip(positions, shard.get_many([keys[p] for p in positions], now)):
+                out[p] = r
+        return out
+
+    def set_many(self, items, ttl_seconds, stale_seconds=0):
+        pairs = list(items.items() if hasattr(items, "items") else items)
+        now = time.time()
+        for shard, positions in self._group([k for k, _ in pairs]):
+            shard.set_many([pairs[p] for p in positions], ttl_seconds, stale_seconds, now)
+
+    def delete_many(self, keys):
+        keys = list(keys)
+        out = [False] * len(keys)
+        for shard, positions in self._group(keys):
+            for p, r in zip(positions, shard.delete_many([keys[p] for p in positions])):
+                out[p] = r
+        return out
+
+    def load_stats(self):
+        total = {}
+        for s in self.shards:
+            for name, v in s.load_stats().items():
+                if name == "load_seconds_max":
+                    total[name] = max(total.get(name, 0.0), v)
+                else:
+                    total[name] = total.get(name, 0) + v
+        return total
+
+    def stats(self):
+        total = {"capacity": self.capacity, "max_bytes": self.max_bytes}
+        counters = ("entries", "resident_bytes", "hits", "misses",
+                    "evictions", "expirations", "overwrites")
+        get_counts, set_counts = [0] * 64, [0] * 64
+        for s in self.shards:
+            st = s.stats()
+            for name in counters:
+                total[name] = total.get(name, 0) + st[name]
+            for merged, hist in ((get_counts, s.get_latency), (set_counts, s.set_latency)):
+                for i, c in enumerate(list(hist.counts)):
+                    merged[i] += c
+        lookups = total["hits"] + total["misses"]
+        total["hit_ratio"] = total["hits"] / lookups if lookups else 0.0
+        total["get_latency"] = LatencyHistogram().summary(get_counts)
+        total["set_latency"] = LatencyHistogram().summary(set_counts)
+        return total
+
+    def size(self):
+        return sum(s.size() for s in self.shards)
+
+    def snapshot(self, path):
+        # Views are taken one shard at a time, so each lock is held briefly
+        return write_snapshot(path, (s._snapshot_view() for s in self.shards))
+
+    def restore(self, path):
+        loaded = 0
+        pending = [[] for _ in self.shards]
+        for rec in read_snapshot(path):
+            i = hash(rec[0]) % len(self.shards)
+            pending[i].append(rec)
+            if len(pending[i]) >= RESTORE_BATCH:
+                loaded += self.shards[i]._restore_records(pending[i])
+                pending[i] = []
+        for shard, recs in zip(self.shards, pending):
+            loaded += shard._restore_records(recs)
+        return loaded
+
+    def _cleanup_loop(self):
+        while True:
+            time.sleep(1)
+            for s in self.shards:
+                s._sweep()  # one shard lock at a time
+
+
+# --- Stats Endpoint ---
+
+def serve_stats(cache, host="127.0.0.1", port=0):
+    """Serve GET /stats as JSON from a background thread. Returns the server."""
+
+    class StatsHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path != "/stats":
+                self.send_response(404)
+                self.end_headers()
+                return
+            body = json.dumps(cache.stats()).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), StatsHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def print_event(event, key, reason):
+    print(f"  [{event}] key={key!r} ({reason})")
 
 
 # --- Demo ---
 
 def main():
-    cache = Cache(capacity=3)
+    cache = Cache(capacity=3, on_event=print_event)
 
     print("=== cache demo (capacity=3) ===\n")
 
@@ -113,6 +1007,95 @@ def main():
         print("GET user:2 -> (miss, expired)")
 
     print(f"\nfinal cache size: {cache.size()}")
+
+    # Sharded variant: same API, one lock per shard
+    print("\n=== sharded cache demo (capacity=8, shards=4) ===\n")
+    sharded = ShardedCache(capacity=8, shards=4, on_event=print_event)
+    for i in range(10):
+        sharded.set(f"item:{i}", i, ttl_seconds=5)
+    val, ok = sharded.get("item:9")
+    print(f"GET item:9 -> {val} (hit={ok})")
+    print(f"sharded size: {sharded.size()} (capacity {sharded.capacity})")
+
+    # Stampede protection: 20 concurrent misses, one backend call
+    print("\n=== get_or_load demo (20 concurrent callers) ===\n")
+    backend_calls = []
+
+    def slow_loader(key):
+        backend_calls.append(key)
+        time.sleep(0.2)
+        return f"profile-of-{key}"
+
+    loading = Cache(capacity=10)
+    callers = [
+        threading.Thread(target=loading.get_or_load,
+                         args=("user:42", slow_loader, 1, 5))
+        for _ in range(20)
+    ]
+    for t in callers:
+        t.start()
+    for t in callers:
+        t.join()
+    print(f"backend calls: {len(backend_calls)}")
+
+    time.sleep(1.1)  # expired, but inside the 5s stale window
+    val = loading.get_or_load("user:42", slow_loader, 1, 5)
+    print(f"after expiry -> {val} (served stale, refreshing in background)")
+    time.sleep(0.3)
+    print(f"load stats: {loading.load_stats()}")
+
+    # Byte budget: a few big values push out many small ones
+    print("\n=== byte-weighted cache demo (max_bytes=10_000) ===\n")
+    weighted = Cache(capacity=1000, max_bytes=10_000, weigher=lambda k, v: len(v))
+    for i in range(20):
+        weighted.set(f"small:{i}", "x" * 100, ttl_seconds=60)
+    weighted.set("blob", "y" * 9_000, ttl_seconds=60)
+    weighted.get("blob")
+    weighted.get("small:0")
+    st = weighted.stats()
+    print(f"entries={st['entries']} resident_bytes={st['resident_bytes']} "
+          f"evictions={st['evictions']} hit_ratio={st['hit_ratio']:.2f}")
+
+    # Warm restart: snapshot to disk, restore into a fresh cache
+    print("\n=== snapshot / restore demo ===\n")
+    path = os.path.join(tempfile.gettempdir(), "cache_demo.snapshot")
+    warm = Cache(capacity=10)
+    warm.set("session:a", {"user": "alice"}, ttl_seconds=60)
+    warm.set("session:b", {"user": "bob"}, ttl_seconds=60)
+    warm.set("session:old", "gone soon", ttl_seconds=0.05)
+    time.sleep(0.1)
+    print(f"snapshot wrote {warm.snapshot(path)} entries")
+    restarted = Cache(capacity=10)
+    print(f"restore loaded {restarted.restore(path)} entries (expired skipped)")
+    print(f"GET session:a -> {restarted.get('session:a')}")
+
+    # Compact storage engine: same get/set API, slot arrays instead of objects
+    print("\n=== slot cache demo (capacity=3) ===\n")
+    slots = SlotCache(capacity=3)
+    for name in ("a", "b", "c"):
+        slots.set(name, name.upper(), ttl_seconds=60)
+    slots.get("a")
+    slots.set("d", "D", ttl_seconds=60)  # evicts b, the LRU slot
+    print(f"GET b -> {slots.get('b')}, GET a -> {slots.get('a')}, size={slots.size()}")
+
+    # Batch calls: one lock hold per shard, results in input order
+    print("\n=== batch demo ===\n")
+    batch = ShardedCache(capacity=100, shards=4)
+    batch.set_many({"p:1": "one", "p:2": "two", "p:3": "three"}, ttl_seconds=60)
+    print(f"get_many -> {batch.get_many(['p:1', 'p:9', 'p:3'])}")
+    print(f"delete_many -> {batch.delete_many(['p:2', 'p:9'])}")
+
+    # Instrumentation: counters + latency histograms over HTTP
+    print("\n=== /stats endpoint ===\n")
+    server = serve_stats(cache)
+    host, port = server.server_address
+    with urlopen(f"http://{host}:{port}/stats", timeout=2) as resp:
+        st = json.loads(resp.read())
+    print(f"hits={st['hits']} misses={st['misses']} evictions={st['evictions']} "
+          f"expirations={st['expirations']} overwrites={st['overwrites']}")
+    print(f"get latency: {st['get_latency']}")
+    server.shutdown()
+    os.remove(path)
     print("\ndemo done")
 
 
@@ -0,0 +1,138 @@
+"""Load generator for memcached_server.py -- throughput and p99 latency.
+
+Opens N persistent connections (asyncio, one process) and has each run a
+closed loop of get/set requests (90% get, 10% set) for a fixed duration.
+
+Run (server in another terminal, or pass --spawn to start one):
+  python3 ./11_system_design_in_go/04_cache_service_mini/memcached_loadgen.py --spawn
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import resource
+import subprocess
+import sys
+import time
+
+KEYS = 10_000
+VALUE = b"v" * 100
+
+
+def percentile(sorted_vals: list, p: float) -> float:
+    if not sorted_vals:
+        return 0.0
+    return sorted_vals[min(len(sorted_vals) - 1, int(len(sorted_vals) * p))]
+
+
+async def read_reply(reader, is_get: bool) -> None:
+    if not is_get:
+        await reader.readuntil(b"\r\n")
+        return
+    while True:
+        line = await reader.readuntil(b"\r\n")
+        if line == b"END\r\n":
+            return
+        nbytes = int(line.split()[3])
+        await reader.readexactly(nbytes + 2)
+
+
+async def client(host, port, deadline, latencies, seed) -> None:
+    reader, writer = await asyncio.open_connection(host, port)
+    rng = random.Random(seed)
+    try:
+        while time.perf_counter() < deadline:
+            key = b"key:%d" % rng.randrange(KEYS)
+            is_get = rng.random() < 0.9
+            if is_get:
+                req = b"get %s\r\n" % key
+            else:
+                req = b"set %s 0 300 %d\r\n%s\r\n" % (key, len(VALUE), VALUE)
+            start = time.perf_counter()
+            writer.write(req)
+            await read_reply(reader, is_get)
+            latencies.append(time.perf_counter() - start)
+    finally:
+        writer.close()
+
+
+async def preload(host, port) -> None:
+    reader, writer = await asyncio.open_connection(host, port)
+    # Pipelined: send every set, then read every reply
+    writer.write(b"".join(b"set key:%d 0 300 %d noreply\r\n%s\r\n" % (i, len(VALUE), VALUE)
+                          for i in range(KEYS)))
+    writer.write(b"version\r\n")
+    await reader.readuntil(b"\r\n")
+    writer.close()
+
+
+async def run_level(host, port, conns: int, duration: float) -> tuple:
+    latencies = []
+    deadline = time.perf_counter() + duration
+    start = time.perf_counter()
+    await asyncio.gather(*(client(host, port, deadline, latencies, i) for i in range(conns)))
+    elapsed = time.perf_counter() - start
+    latencies.sort()
+    return len(latencies) / elapsed, percentile(latencies, 0.50), percentile(latencies, 0.99)
+
+
+async def wait_for_server(host, port, timeout: float = 5.0) -> None:
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            _, writer = await asyncio.open_connection(host, port)
+            writer.close()
+            return
+        except OSError:
+            if time.monotonic() > deadline:
+                raise
+            await asyncio.sleep(0.05)
+
+
+async def run(args) -> None:
+    await wait_for_server(args.host, args.port)
+    await preload(args.host, args.port)
+    print(f"=== memcached load ({args.duration:.0f}s per level, 90% get / 10% set) ===\n")
+    print(f"  {'conns':>5}  {'ops/sec':>10}  {'p50':>9}  {'p99':>9}")
+    for conns in args.conns:
+        ops, p50, p99 = await run_level(args.host, args.port, conns, args.duration)
+        print(f"  {conns:>5}  {ops:>10,.0f}  {p50*1e3:>6.2f} ms  {p99*1e3:>6.2f} ms")
+    print("\nNote: client and server share the host; each is a single Python thread.")
+
+
+def raise_fd_limit() -> None:
+    """1024 connections need more than the common default of 1024 fds."""
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    if soft < hard:
+        resource.setrlimit(resource.RLIMIT_NOFILE, (hard, hard))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="memcached protocol load generator")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=11211)
+    parser.add_argument("--duration", type=float, default=5.0, help="seconds per level")
+    parser.add_argument("--conns", type=int, nargs="+", default=[1, 64, 1024])
+    parser.add_argument("--spawn", action="store_true", help="start a server subprocess")
+    args = parser.parse_args()
+
+    raise_fd_limit()
+    server = None
+    if args.spawn:
+        here = os.path.dirname(os.path.abspath(__file__))
+        server = subprocess.Popen(
+            [sys.executable, os.path.join(here, "memcached_server.py"),
+             "--host", args.host, "--port", str(args.port)],
+            stdout=subprocess.DEVNULL,
+        )
+    try:
+        asyncio.run(run(args))
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait()
+
+
+if __name__ == "__main__":
+    main()
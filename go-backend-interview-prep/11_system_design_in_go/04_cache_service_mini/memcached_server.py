@@ -0,0 +1,228 @@
+"""Memcached text-protocol front-end for the cache -- asyncio, one event loop.
+
+Supports get/gets (multi-key), set, delete, touch, stats, version and quit.
+Requests may be pipelined on a persistent connection; replies come back in
+order. All connections share one event loop thread instead of one thread
+per connection.
+
+Run:  python3 ./11_system_design_in_go/04_cache_service_mini/memcached_server.py
+Try:  printf 'set a 0 60 5\\r\\nhello\\r\\nget a\\r\\n' | nc localhost 11211
+"""
+
+import argparse
+import asyncio
+import itertools
+import time
+
+from main import Cache
+
+READ_SIZE = 64 * 1024
+MAX_LINE_LEN = 2048
+MAX_KEY_LEN = 250
+MAX_VALUE_LEN = 1024 * 1024
+RELATIVE_EXPTIME_MAX = 30 * 24 * 3600  # larger exptimes are absolute unix times
+FOREVER = 10 * 365 * 24 * 3600  # exptime 0: "never" expires
+
+
+def exptime_to_ttl(exptime):
+    """Convert a memcached exptime to a TTL in seconds."""
+    if exptime == 0:
+        return FOREVER
+    if exptime > RELATIVE_EXPTIME_MAX:
+        return exptime - time.time()
+    return exptime  # negative means already expired
+
+
+class MemcachedServer:
+    """Protocol handler around a Cache holding (flags, data, cas) tuples."""
+
+    def __init__(self, cache):
+        self.cache = cache
+        self.cas = itertools.count(1)
+        self.started = time.time()
+        self.connections = 0
+        self.total_connections = 0
+        self.commands = 0
+
+    async def handle(self, reader, writer):
+        self.connections += 1
+        self.total_connections += 1
+        buf = bytearray()
+        try:
+            while True:
+                chunk = await reader.read(READ_SIZE)
+                if not chunk:
+                    break
+                buf += chunk
+                # Answer every complete pipelined command with one write
+                out = []
+                consumed, keep_open = self._process(buf, out)
+                del buf[:consumed]
+                if out:
+                    writer.write(b"".join(out))
+                    await writer.drain()
+                if not keep_open:
+                    break
+        except ConnectionError:
+            pass
+        finally:
+            self.connections -= 1
+            writer.close()
+
+    def _process(self, buf, out):
+        """Run complete commands in buf. Returns (bytes consumed, keep open)."""
+        pos = 0
+        while True:
+            eol = buf.find(b"\r\n", pos)
+            if eol < 0:
+                if len(buf) - pos > MAX_LINE_LEN:
+                    out.append(b"CLIENT_ERROR line too long\r\n")
+                    return pos, False
+                return pos, True
+            parts = bytes(buf[pos:eol]).split()
+            nxt = eol + 2
+            if not parts:
+                out.append(b"ERROR\r\n")
+                pos = nxt
+                continue
+            cmd = parts[0]
+            if cmd == b"set":
+                nxt = self._set(buf, nxt, parts[1:], out)
+                if nxt is None:
+                    return pos, True  # data block not fully received yet
+                if nxt < 0:
+                    return pos, False
+            elif cmd == b"get" or cmd == b"gets":
+                self._get(out, parts[1:], with_cas=cmd == b"gets")
+            elif cmd == b"delete":
+                self._delete(out, parts[1:])
+            elif cmd == b"touch":
+                self._touch(out, parts[1:])
+            elif cmd == b"stats":
+                self._stats(out)
+            elif cmd == b"version":
+                out.append(b"VERSION 1.6.0-py\r\n")
+            elif cmd == b"quit":
+                return nxt, False
+            else:
+                out.append(b"ERROR\r\n")
+            self.commands += 1
+            pos = nxt
+
+    def _get(self, out, keys, with_cas):
+        if not keys:
+            out.append(b"ERROR\r\n")
+            return
+        for key, (item, found) in zip(keys, self.cache.get_many(keys)):
+            if not found:
+                continue
+            flags, data, cas = item
+            if with_cas:
+                out.append(b"VALUE %s %d %d %d\r\n" % (key, flags, len(data), cas))
+            else:
+                out.append(b"VALUE %s %d %d\r\n" % (key, flags, len(data)))
+            out.append(data)
+            out.append(b"\r\n")
+        out.append(b"END\r\n")
+
+    def _set(self, buf, start, args, out):
+        """Store a value whose data block begins at start.
+
+        Returns the offset after the block, None if the block is incomplete,
+        or -1 if the connection must be closed (cannot resync).
+        """
+        noreply = args[-1:] == [b"noreply"]
+        if noreply:
+            args = args[:-1]
+        try:
+            key, flags, exptime, nbytes = args[0], int(args[1]), int(args[2]), int(args[3])
+        except (IndexError, ValueError):
+            out.append(b"CLIENT_ERROR bad command line format\r\n")
+            return -1
+        if nbytes < 0 or nbytes > MAX_VALUE_LEN:
+            out.append(b"SERVER_ERROR object too large for cache\r\n")
+            return -1
+        end = start + nbytes
+        if len(buf) < end + 2:
+            return None
+        if buf[end:end + 2] != b"\r\n":
+            out.append(b"CLIENT_ERROR bad data chunk\r\n")
+            return -1
+        if len(key) > MAX_KEY_LEN:
+            out.append(b"CLIENT_ERROR key too long\r\n")
+            return end + 2
+        data = bytes(buf[start:end])
+        self.cache.set(key, (flags, data, next(self.cas)), exptime_to_ttl(exptime))
+        if not noreply:
+            out.append(b"STORED\r\n")
+        return end + 2
+
+    def _delete(self, out, args):
+        if not args:
+            out.append(b"ERROR\r\n")
+            return
+        deleted = self.cache.delete(args[0])
+        if args[-1:] != [b"noreply"]:
+            out.append(b"DELETED\r\n" if deleted else b"NOT_FOUND\r\n")
+
+    def _touch(self, out, args):
+        try:
+            key, exptime = args[0], int(args[1])
+        except (IndexError, ValueError):
+            out.append(b"CLIENT_ERROR bad command line format\r\n")
+            return
+        touched = self.cache.touch(key, exptime_to_ttl(exptime))
+        if args[-1:] != [b"noreply"]:
+            out.append(b"TOUCHED\r\n" if touched else b"NOT_FOUND\r\n")
+
+    def _stats(self, out):
+        st = self.cache.stats()
+        now = time.time()
+        rows = [
+            ("uptime", int(now - self.started)),
+            ("time", int(now)),
+            ("curr_connections", self.connections),
+            ("total_connections", self.total_connections),
+            ("cmd_total", self.commands),
+            ("get_hits", st["hits"]),
+            ("get_misses", st["misses"]),
+            ("evictions", st["evictions"]),
+            ("curr_items", st["entries"]),
+            ("bytes", st["resident_bytes"]),
+            ("limit_maxbytes", st["max_bytes"] or 0),
+        ]
+        out.extend(b"STAT %s %s\r\n" % (name.encode(), str(v).encode()) for name, v in rows)
+        out.append(b"END\r\n")
+
+
+def item_weigher(key, item):
+    """Bytes for key + data plus a fixed per-entry overhead estimate."""
+    return len(key) + len(item[1]) + 64
+
+
+def new_cache(max_bytes):
+    return Cache(capacity=10_000_000, max_bytes=max_bytes, weigher=item_weigher)
+
+
+async def serve(host, port, max_bytes):
+    mc = MemcachedServer(new_cache(max_bytes))
+    server = await asyncio.start_server(mc.handle, host, port, backlog=2048)
+    print(f"memcached-protocol cache on {host}:{port} (max {max_bytes >> 20} MiB)")
+    async with server:
+        await server.serve_forever()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="memcached text-protocol cache server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=11211)
+    parser.add_argument("--max-mb", type=int, default=64, help="byte budget in MiB")
+    args = parser.parse_args()
+    try:
+        asyncio.run(serve(args.host, args.port, args.max_mb << 20))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
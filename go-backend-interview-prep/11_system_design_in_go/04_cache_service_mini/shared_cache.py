@@ -0,0 +1,239 @@
+"""Cross-process cache on multiprocessing.shared_memory.
+
+Worker processes on one host attach to the same block of shared memory, so
+they share one hot set instead of each holding a private Cache.
+
+Layout (one SharedMemory block):
+  slot table  -- segments x slots_per_segment fixed-size slot headers
+  value arena -- slot_bytes per slot, holding the key bytes then the value
+
+Each key hashes (stable blake2b, not the per-process str hash) to a segment
+and to a home slot inside it. Open addressing probes up to PROBE_LIMIT
+slots within that segment; each segment has its own lock, so processes
+touching different segments never wait on each other. When a probe window
+is full the least recently used slot in the window is overwritten.
+
+Run: python3 ./11_system_design_in_go/04_cache_service_mini/shared_cache.py
+"""
+
+import hashlib
+import multiprocessing as mp
+import os
+import pickle
+import struct
+import time
+from multiprocessing import shared_memory
+
+# Slot header: key hash, expires_at, last_used, key_len, value_len
+_SLOT = struct.Struct("<QddHI")
+SLOT_HEADER = 32  # _SLOT.size (30) padded for alignment
+EMPTY = 0  # never used: a probe can stop here
+TOMBSTONE = 1  # deleted or expired: a probe must continue past it
+PROBE_LIMIT = 16
+
+
+def _key_bytes(key):
+    return key.encode() if isinstance(key, str) else bytes(key)
+
+
+def _hash(kb):
+    h = int.from_bytes(hashlib.blake2b(kb, digest_size=8).digest(), "little")
+    return h if h > TOMBSTONE else h + 2  # 0 and 1 are reserved markers
+
+
+class SharedCache:
+    """get/set/delete with TTL over a shared-memory hash table.
+
+    Create it once in the parent, then pass it to child processes as a
+    Process argument; children attach to the same memory and locks.
+    Keys are str or bytes; values are pickled and must fit in slot_bytes
+    together with the key.
+    """
+
+    def __init__(self, segments=64, slots_per_segment=1024, slot_bytes=256):
+        self.segments = segments
+        self.slots_per_segment = slots_per_segment
+        self.slot_bytes = slot_bytes
+        nslots = segments * slots_per_segment
+        self.arena_offset = nslots * SLOT_HEADER
+        self.shm = shared_memory.SharedMemory(
+            create=True, size=self.arena_offset + nslots * slot_bytes)
+        self.shm.buf[:self.arena_offset] = bytes(self.arena_offset)  # all EMPTY
+        self.locks = [mp.Lock() for _ in range(segments)]
+        self.owner_pid = os.getpid()  # forked children inherit this object
+
+    # --- process handoff ---
+
+    def __getstate__(self):
+        # Locks pickle only while a child process is being spawned
+        return {
+            "name": self.shm.name,
+            "locks": self.locks,
+            "segments": self.segments,
+            "slots_per_segment": self.slots_per_segment,
+            "slot_bytes": self.slot_bytes,
+        }
+
+    def __setstate__(self, state):
+        self.segments = state["segments"]
+        self.slots_per_segment = state["slots_per_segment"]
+        self.slot_bytes = state["slot_bytes"]
+        self.locks = state["locks"]
+        self.arena_offset = self.segments * self.slots_per_segment * SLOT_HEADER
+        # Children share the parent's resource tracker, so attaching here
+        # does not schedule a second unlink.
+        self.shm = shared_memory.SharedMemory(name=state["name"])
+        self.owner_pid = None
+
+    def close(self):
+        """Detach; the creating process also frees the memory."""
+        self.shm.close()
+        if self.owner_pid == os.getpid():
+            self.shm.unlink()
+
+    # --- slot helpers (caller holds the segment lock) ---
+
+    def _locate(self, h):
+        seg = h % self.segments
+        home = (h // self.segments) % self.slots_per_segment
+        return seg, seg * self.slots_per_segment, home
+
+    def _probe(self, base, home):
+        n = self.slots_per_segment
+        for i in range(min(PROBE_LIMIT, n)):
+            yield base + (home + i) % n
+
+    def _key_matches(self, slot, kb, klen):
+        off = self.arena_offset + slot * self.slot_bytes
+        return klen == len(kb) and self.shm.buf[off:off + klen] == kb
+
+    # --- public API (same shape as Cache) ---
+
+    def get(self, key):
+        kb = _key_bytes(key)
+        h = _hash(kb)
+        seg, base, home = self._locate(h)
+        buf = self.shm.buf
+        data = None
+        with self.locks[seg]:
+            now = time.time()
+            for slot in self._probe(base, home):
+                hdr = slot * SLOT_HEADER
+                sh, expires_at, _, klen, vlen = _SLOT.unpack_from(buf, hdr)
+                if sh == EMPTY:
+                    break
+                if sh != h or not self._key_matches(slot, kb, klen):
+                    continue
+                if now > expires_at:
+                    _SLOT.pack_into(buf, hdr, TOMBSTONE, 0.0, 0.0, 0, 0)
+                    break
+                _SLOT.pack_into(buf, hdr, h, expires_at, now, klen, vlen)
+                off = self.arena_offset + slot * self.slot_bytes + klen
+                data = bytes(buf[off:off + vlen])  # copy out, unpickle unlocked
+                break
+        if data is None:
+            return None, False
+        return pickle.loads(data), True
+
+    def set(self, key, value, ttl_seconds):
+        kb = _key_bytes(key)
+        vb = pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+        if len(kb) + len(vb) > self.slot_bytes:
+            raise ValueError(f"key+value is {len(kb) + len(vb)} bytes; "
+                             f"slot holds {self.slot_bytes}")
+        h = _hash(kb)
+        seg, base, home = self._locate(h)
+        buf = self.shm.buf
+        with self.locks[seg]:
+            now = time.time()
+            target = None
+            lru_slot, lru_used = None, float("inf")
+            for slot in self._probe(base, home):
+                sh, expires_at, last_used, klen, _ = _SLOT.unpack_from(buf, slot * SLOT_HEADER)
+                if sh == h and self._key_matches(slot, kb, klen):
+                    target = slot  # overwrite in place
+                    break
+                if sh == EMPTY:
+                    if target is None:
+                        target = slot
+                    break  # key cannot be further along the chain
+                if target is None and (sh == TOMBSTONE or now > expires_at):
+                    target = slot  # reusable, but keep looking for the key
+                if last_used < lru_used:
+                    lru_slot, lru_used = slot, last_used
+            if target is None:
+                target = lru_slot  # window full of live keys: evict its LRU
+            off = self.arena_offset + target * self.slot_bytes
+            buf[off:off + len(kb)] = kb
+            buf[off + len(kb):off + len(kb) + len(vb)] = vb
+            _SLOT.pack_into(buf, target * SLOT_HEADER, h, now + ttl_seconds, now,
+                            len(kb), len(vb))
+
+    def delete(self, key):
+        kb = _key_bytes(key)
+        h = _hash(kb)
+        seg, base, home = self._locate(h)
+        buf = self.shm.buf
+        with self.locks[seg]:
+            for slot in self._probe(base, home):
+                sh, _, _, klen, _ = _SLOT.unpack_from(buf, slot * SLOT_HEADER)
+                if sh == EMPTY:
+                    return False
+                if sh == h and self._key_matches(slot, kb, klen):
+                    _SLOT.pack_into(buf, slot * SLOT_HEADER, TOMBSTONE, 0.0, 0.0, 0, 0)
+                    return True
+        return False
+
+    def size(self):
+        """Count live entries (O(slots): scans the whole table)."""
+        now = time.time()
+        buf = self.shm.buf
+        live = 0
+        for seg in range(self.segments):
+            with self.locks[seg]:
+                base = seg * self.slots_per_segment
+                for slot in range(base, base + self.slots_per_segment):
+                    sh, expires_at, _, _, _ = _SLOT.unpack_from(buf, slot * SLOT_HEADER)
+                    if sh > TOMBSTONE and now <= expires_at:
+                        live += 1
+        return live
+
+
+# --- Demo ---
+
+def worker(cache, wid, results):
+    hits = 0
+    for i in range(1000):
+        key = f"user:{i % 200}"
+        _, ok = cache.get(key)
+        if ok:
+            hits += 1
+        else:
+            cache.set(key, {"id": i % 200, "filled_by": wid}, ttl_seconds=60)
+    results.put((wid, hits))
+    cache.close()
+
+
+def main():
+    cache = SharedCache(segments=16, slots_per_segment=256)
+    print("=== shared-memory cache demo (4 processes, 200 hot keys) ===\n")
+
+    cache.set("config", {"feature_x": True}, ttl_seconds=60)
+    results = mp.Queue()
+    procs = [mp.Process(target=worker, args=(cache, w, results)) for w in range(4)]
+    for p in procs:
+        p.start()
+    for p in procs:
+        p.join()
+    for wid, hits in sorted(results.get() for _ in procs):
+        print(f"worker {wid}: {hits}/1000 hits")
+
+    val, ok = cache.get("user:7")
+    print(f"\nparent GET user:7 -> {val} (set by a child process)")
+    print(f"live entries: {cache.size()}")
+    cache.close()
+    print("\ndemo done")
+
+
+if __name__ == "__main__":
+    main()
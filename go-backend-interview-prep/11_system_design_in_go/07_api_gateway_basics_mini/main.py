@@ -5,34 +5,137 @@ import os
 import threading
 import time
 import uuid
+from collections import OrderedDict
 from http.server import HTTPServer, BaseHTTPRequestHandler
 from urllib.request import urlopen, Request
 from urllib.error import URLError
 
 
-# --- Rate Limiter (fixed window) ---
+# --- Rate Limiter (fixed or sliding window counter) ---
+
+STALE_SCAN = 2  # max stale keys dropped per allow() call
+
 
 class RateLimiter:
-    def __init__(self, limit, window_sec):
+    """Per-key request counters over aligned windows of window_sec.
+
+    mode="fixed":   count requests in the current window only.
+    mode="sliding": also weight the previous window's count by how much of
+                    it still overlaps the last window_sec, so a client cannot
+                    burst to twice the limit across a window boundary.
+
+    Each key rolls its own counters forward when it is next seen. Keys idle
+    for two windows hold no useful state and are dropped a few per call from
+    the cold end of the LRU-ordered dict -- there is no global reset.
+    """
+
+    def __init__(self, limit, window_sec, mode="fixed"):
+        if mode not in ("fixed", "sliding"):
+            raise ValueError(f"unknown rate limit mode {mode!r}")
         self.lock = threading.Lock()
-        self.counts = {}
+        self.counts = OrderedDict()  # key -> [window index, count, previous count]
         self.limit = limit
         self.window = window_sec
-        self.last_reset = time.time()
+        self.mode = mode
 
     def allow(self, key):
         with self.lock:
-            if time.time() - self.last_reset > self.window:
-                self.counts = {}
-                self.last_reset = time.time()
-            self.counts[key] = self.counts.get(key, 0) + 1
-            return self.counts[key] <= self.limit
+            pos = time.time() / self.window
+            win = int(pos)
+            state = self.counts.get(key)
+            if state is None:
+                state = self.counts[key] = [win, 0, 0]
+            else:
+                self.counts.move_to_end(key)
+                if state[0] != win:
+                    state[2] = state[1] if state[0] == win - 1 else 0
+                    state[1] = 0
+                    state[0] = win
+            count = state[1]
+            if self.mode == "sliding":
+                count += state[2] * (1.0 - (pos - win))
+            allowed = count < self.limit
+            if allowed:
+                state[1] += 1
+            self._age(win)
+            return allowed
+
+    def _age(self, win):
+        """Drop keys last seen before the previous window. Caller holds the lock."""
+        for _ in range(STALE_SCAN):
+            key, state = next(iter(self.counts.items()))
+            if state[0] >= win - 1:
+                return  # ordered by last use: everything after is newer
+            del self.counts[key]
+
+
+# --- Hierarchical quotas (API key -> tenant -> global) ---
+
+class HierarchicalLimiter:
+    """Token buckets at key, tenant and global level, checked in one pass.
+
+    One lock and one clock read cover all three levels: every bucket is
+    refilled and checked first, and tokens are debited only if all of them
+    can pay, so a rejection never spends quota at any level. check()
+    returns None when admitted, else the first level that rejected.
+    Key and tenant buckets that have refilled to their burst are dropped a
+    few per call, as in RateLimiter.
+    """
+
+    LEVELS = ("key", "tenant", "global")
+
+    def __init__(self, key_limit, tenant_limit, global_limit):
+        # each limit is (tokens per second, burst)
+        self.lock = threading.Lock()
+        self.limits = dict(zip(self.LEVELS, (key_limit, tenant_limit, global_limit)))
+        self.buckets = {level: OrderedDict() for level in self.LEVELS}  # name -> [tokens, last]
+
+    def check(self, api_key, tenant, cost=1):
+        with self.lock:
+            now = time.monotonic()
+            charged = []
+            for level, name in zip(self.LEVELS, (api_key, tenant, "*")):
+                rate, burst = self.limits[level]
+                buckets = self.buckets[level]
+                b = buckets.get(name)
+                if b is None:
+                    b = buckets[name] = [burst, now]
+                else:
+                    buckets.move_to_end(name)
+                    # Refill is not a debit: committing it before deciding is safe
+                    b[0] = min(burst, b[0] + (now - b[1]) * rate)
+                    b[1] = now
+                if b[0] < cost:
+                    return level
+                charged.append(b)
+            for b in charged:
+                b[0] -= cost
+            self._age(now)
+            return None
+
+    def _age(self, now):
+        """Drop key/tenant buckets that are full again. Caller holds the lock."""
+        for level in ("key", "tenant"):
+            rate, burst = self.limits[level]
+            buckets = self.buckets[level]
+            for _ in range(min(STALE_SCAN, len(buckets))):
+                name, (tokens, last) = next(iter(buckets.items()))
+                if tokens + (now - last) * rate < burst:
+                    break  # ordered by last use: everything after is newer
+                del buckets[name]
 
 
 # --- Config ---
 
-VALID_KEYS = {"key-abc-123", "key-xyz-789"}
-rate_limiter = RateLimiter(limit=5, window_sec=10)
+API_KEY_TENANTS = {
+    "key-abc-123": "acme",
+    "key-xyz-789": "acme",
+    "key-def-456": "globex",
+}
+VALID_KEYS = set(API_KEY_TENANTS)
+rate_limiter = RateLimiter(limit=20, window_sec=10, mode="sliding")  # per client IP
+quotas = HierarchicalLimiter(
+    key_limit=(0.05, 3), tenant_limit=(0.1, 5), global_limit=(0.2, 7))
 
 
 # --- Gateway Handler ---
@@ -47,10 +150,14 @@ class GatewayHandler(BaseHTTPRequestHandler):
             self._respond(401, {"error": "invalid or missing API key"}, request_id)
             return
 
-        # Rate limit
+        # Rate limit: per client IP, then key/tenant/global quotas
         client_key = self.client_address[0]
         if not rate_limiter.allow(client_key):
-            self._respond(429, {"error": "rate limit exceeded"}, request_id)
+            self._respond(429, {"error": "rate limit exceeded", "level": "ip"}, request_id)
+            return
+        level = quotas.check(api_key, API_KEY_TENANTS[api_key])
+        if level is not None:
+            self._respond(429, {"error": "rate limit exceeded", "level": level}, request_id)
             return
 
         # Route
@@ -123,11 +230,12 @@ def run_demo():
     status, body = fetch("/api/unknown", "key-abc-123")
     print(f"GET /api/unknown: status={status}")
 
-    # Rate limit test
-    print("\n--- Rate limit test (limit=5/10s) ---")
-    for i in range(1, 8):
-        status, _ = fetch("/api/users", "key-xyz-789")
-        print(f"req {i}: status={status}")
+    # Quota test: acme's two keys share a tenant budget, everyone shares global
+    print("\n--- Quota test (burst: key 3, tenant 5, global 7) ---")
+    for api_key in ["key-xyz-789"] * 3 + ["key-def-456"] * 3 + ["key-abc-123"]:
+        status, body = fetch("/api/users", api_key)
+        rejected = f" rejected by {body['level']}" if status == 429 else ""
+        print(f"{api_key} ({API_KEY_TENANTS[api_key]}): status={status}{rejected}")
 
     print("\ndemo done")
     os._exit(0)